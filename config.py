@@ -27,6 +27,13 @@ DEFAULT_SETTINGS = {
     'rebalance_frequency': 21,
 }
 
+FACTOR_BLEND = {
+    'mom_score': 0.3,
+    'size_score': 0.2,
+    'value_score': 0.3,
+    'quality_score': 0.2,
+}
+
 FACTOR_CONSTRAINTS = {
     # Toraniko factors
     'market': 0.2,  # ±20% net market exposure
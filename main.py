@@ -1,12 +1,20 @@
 import polars as pl
+import numpy as np
 from pathlib import Path
 
-from src.data import load_and_process_data
+from config import FACTOR_BLEND
+
+from src.data import load_and_process_data, pivot_panel
 from src.factors import factor_mom, factor_size, factor_value, factor_quality
 from src.risk_model import build_risk_model
 from src.portfolio import construct_portfolio, calculate_returns
 from src.backtest import backtest_strategy
+from src.checkpoint import run_fingerprint
 from src.attribution import perform_attribution
+from src.bootstrap import bootstrap_metrics, confidence_intervals
+from src.results_store import ResultsStore
+from src.universe import UniverseIndex
+from src.stress import FF_FACTORS
 from src.plotting import (
     plot_factor_exposures,
     plot_risk_decomposition,
@@ -14,6 +22,57 @@ from src.plotting import (
 )
 
 
+class BiotechStrategy:
+    """
+    Strategy generating positions for a given date from blended factor
+    scores and a fixed risk model.
+
+    A plain class rather than a closure so it can be pickled to the
+    rebalance worker processes.
+    """
+
+    def __init__(self, factor_scores, exposures, factor_cov, specific_risk, universe,
+                 target_gmv, max_position):
+        self.factor_scores = factor_scores
+        self.exposures = exposures
+        self.factor_cov = factor_cov
+        self.specific_risk = specific_risk
+        self.universe = universe
+        self.target_gmv = target_gmv
+        self.max_position = max_position
+
+    def __call__(self, current_stocks, current_factors, current_date):
+        # Get latest factor scores, in universe order to match the risk model
+        symbols = pl.DataFrame({
+            'symbol': pl.Series(self.universe.symbols, dtype=self.factor_scores.schema["symbol"])
+        })
+        latest_scores = symbols.join(
+            self.factor_scores.filter(pl.col("date") <= current_date).sort("date").group_by("symbol").last(),
+            on="symbol",
+            how="left"
+        )
+
+        # Create alpha signal from factor scores
+        alphas = sum(latest_scores[col].fill_null(0.0) * weight for col, weight in FACTOR_BLEND.items())
+
+        # Names not trading today are held at zero weight
+        tradable = self.universe.tradable(current_date)
+
+        # Construct portfolio
+        # Simplified for explanation - risk model would need proper time filtering
+        positions, stats = construct_portfolio(
+            alphas,
+            self.exposures,
+            self.factor_cov,
+            self.specific_risk,
+            self.target_gmv,
+            self.max_position,
+            tradable=tradable
+        )
+
+        return dict(zip(self.universe.symbols, positions)), stats
+
+
 def run_portfolio_system(
         stock_files,
         factor_file,
@@ -22,16 +81,24 @@ def run_portfolio_system(
         initial_capital=10_000_000,
         rebalance_frequency=21,
         max_position=0.15,
-        output_dir="./output"
+        output_dir="./output",
+        resume=False,
+        parallel_rebalance=False,
+        n_jobs=None
 ):
     """
     Run the complete biotech portfolio management system.
+
+    ``parallel_rebalance`` and ``n_jobs`` are passed to ``backtest_strategy``
+    to solve the rebalances across processes.
     """
     print("Loading and processing data...")
     stocks_data, factors_data = load_and_process_data(
         stock_files, factor_file, start_date, end_date
     )
 
+    universe = UniverseIndex.from_stock_data(stocks_data)
+
     # Create directory for outputs
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True, parents=True)
@@ -54,71 +121,102 @@ def run_portfolio_system(
     )
 
     print("Building risk model...")
+    # Stocks x dates returns in universe order so the membership mask lines up
+    _, _, returns_panel = pivot_panel(returns_data, "asset_returns", universe.dates, universe.symbols)
+    factor_returns = (
+        pl.DataFrame({'date': universe.dates})
+        .join(factors_data, on="date", how="left")
+        .select(FF_FACTORS)
+    )
+    mcaps = (
+        pl.DataFrame({'symbol': pl.Series(universe.symbols, dtype=stocks_data.schema["symbol"])})
+        .join(stocks_data.sort("date").group_by("symbol").last(), on="symbol", how="left")
+        .select("market_cap")
+    )
+    mask = universe.bitmap.T & np.all(np.isfinite(factor_returns.to_numpy()), axis=1)
+
     # Build risk model
     exposures, factor_cov, specific_risk = build_risk_model(
-        returns_data, factors_data, stocks_data.select("market_cap")
+        returns_panel.T, factor_returns, mcaps, mask=mask
     )
 
-    # Define strategy function for backtesting
-    def biotech_strategy(current_stocks, current_factors, current_date):
-        """Strategy function that generates positions for a given date."""
-        # Get latest factor scores
-        latest_scores = factor_scores.filter(pl.col("date") <= current_date).sort("date").group_by("symbol").last()
-
-        # Create alpha signal from factor scores
-        alphas = (
-                latest_scores["mom_score"] * 0.3 +
-                latest_scores["size_score"] * 0.2 +
-                latest_scores["value_score"] * 0.3 +
-                latest_scores["quality_score"] * 0.2
-        )
-
-        # Get latest risk model data
-        # Simplified for explanation - would need proper time filtering
-        latest_exposures = exposures
-        latest_factor_cov = factor_cov
-        latest_specific_risk = specific_risk
-
-        # Construct portfolio
-        positions, stats = construct_portfolio(
-            alphas,
-            latest_exposures,
-            latest_factor_cov,
-            latest_specific_risk,
-            initial_capital,
-            max_position
-        )
-
-        return positions, stats
+    # Define strategy for backtesting
+    biotech_strategy = BiotechStrategy(
+        factor_scores, exposures, factor_cov, specific_risk, universe, initial_capital, max_position
+    )
 
     print("Running backtest...")
+    fingerprint = run_fingerprint(
+        "biotech_strategy",
+        {'max_position': max_position, **FACTOR_BLEND},
+        stocks_data,
+        factors_data
+    )
     backtest_results = backtest_strategy(
         initial_capital,
-        stocks_data,
+        returns_data,
         factors_data,
         biotech_strategy,
         rebalance_frequency,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        checkpoint_path=output_path / f"backtest-{fingerprint[:16]}.ckpt",
+        resume=resume,
+        universe=universe,
+        fingerprint=fingerprint,
+        parallel_rebalance=parallel_rebalance,
+        n_jobs=n_jobs
     )
 
     print("Performing attribution analysis...")
+    # Final holdings against the model's factors over the backtest window
+    final_state = backtest_results['portfolio_history'][-1]
+    final_positions = np.array([final_state['positions'].get(s, 0.0) for s in universe.symbols])
+    window = np.isin(np.array(universe.dates), np.array(backtest_results['dates']))
+    window_factor_returns = factor_returns.filter(pl.Series(window))
+    specific_returns = (
+        np.nan_to_num(returns_panel[window].T)
+        - exposures @ np.nan_to_num(window_factor_returns.to_numpy()).T
+    )
     attribution_results = perform_attribution(
-        backtest_results[-1]["positions"],
+        final_positions,
         exposures,
-        factors_data,
-        returns_data.filter(pl.col("date") > backtest_results[-1]["date"]),
-        stocks_data.select("symbol").unique()
+        window_factor_returns,
+        specific_returns
+    )
+
+    print("Storing results...")
+    ResultsStore(output_path / "results").write_run(
+        backtest_results,
+        params={
+            'initial_capital': initial_capital,
+            'rebalance_frequency': rebalance_frequency,
+            'max_position': max_position,
+        },
+        attribution_results=attribution_results
     )
 
     print("Generating reports...")
-    factor_plot = plot_factor_exposures([r["portfolio_stats"] for r in backtest_results if "portfolio_stats" in r])
+    stats_history = [
+        {
+            **state["portfolio_stats"],
+            'date': state["date"],
+            'factor_exposures': dict(zip(FF_FACTORS, state["portfolio_stats"]["factor_exposures"])),
+        }
+        for state in backtest_results['portfolio_history'] if state.get("portfolio_stats")
+    ]
+    factor_plot = plot_factor_exposures(stats_history)
     factor_plot.savefig(output_path / "factor_exposures.png")
 
-    risk_plot = plot_risk_decomposition([r["portfolio_stats"] for r in backtest_results if "portfolio_stats" in r])
+    risk_plot = plot_risk_decomposition(stats_history)
     risk_plot.savefig(output_path / "risk_decomposition.png")
 
-    perf_report = create_performance_report(backtest_results, attribution_results)
+    years = (backtest_results['dates'][-1] - backtest_results['dates'][0]).days / 365.25
+    metric_intervals = confidence_intervals(bootstrap_metrics(backtest_results['returns'], years, seed=0))
+
+    perf_report = create_performance_report(
+        backtest_results, attribution_results, confidence_intervals=metric_intervals
+    )
     perf_report.savefig(output_path / "performance_report.png")
 
     print(f"Analysis complete. Results saved to {output_path}")
@@ -1,19 +1,22 @@
+import os
+import pickle
+import multiprocessing
 import polars as pl
 import numpy as np
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
+from src.data import pivot_panel
+from src.checkpoint import save_checkpoint, load_checkpoint, append_history, load_history
+from src.portfolio import alpha_weights, calculate_returns, solver_state, restore_solver_state
+from src.math_utils import forward_fill
+from src.universe import UniverseIndex
 
-def backtest_strategy(
-        initial_capital,
-        stock_data,
-        factor_data,
-        strategy_func,
-        rebalance_frequency=21,  # Monthly in trading days
-        transaction_cost=0.0005,  # 5bps per trade
-        start_date=None,
-        end_date=None
-):
 
+def _backtest_dates(stock_data, start_date=None, end_date=None):
+    """
+    Sorted trading dates of the stock panel within the backtest range.
+    """
     if isinstance(start_date, str):
         start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
     if isinstance(end_date, str):
@@ -30,11 +33,194 @@ def backtest_strategy(
     if not dates:
         raise ValueError("No dates available for backtesting within the specified range")
 
+    return dates
+
+
+def _position_vector(positions, universe):
+    """
+    Dense position vector in ``universe.symbols`` order; unknown tickers are ignored.
+    """
+    vec = np.zeros(len(universe.symbols))
+    for ticker, position in positions.items():
+        j = universe.symbol_idx.get(ticker)
+        if j is not None:
+            vec[j] = position
+    return vec
+
+
+def _drop_masked(positions, mask, universe):
+    """
+    Positions without the tickers flagged in ``mask``.
+    """
+    return {
+        ticker: position for ticker, position in positions.items()
+        if ticker not in universe.symbol_idx or not mask[universe.symbol_idx[ticker]]
+    }
+
+
+# Inputs shared with rebalance pool workers, set once per process
+_REBALANCE_INPUTS = {}
+
+
+def _init_rebalance_worker(stock_data, factor_data, strategy_func):
+    """
+    Install the backtest inputs in a rebalance pool worker.
+    """
+    _REBALANCE_INPUTS['stock_data'] = stock_data
+    _REBALANCE_INPUTS['factor_data'] = factor_data
+    _REBALANCE_INPUTS['strategy_func'] = strategy_func
+
+
+def _solve_rebalance(date):
+    """
+    Target positions for one rebalance date, or the exception it raised.
+    """
+    stock_data = _REBALANCE_INPUTS['stock_data']
+    factor_data = _REBALANCE_INPUTS['factor_data']
+    try:
+        return _REBALANCE_INPUTS['strategy_func'](
+            stock_data.filter(pl.col("date") <= date),
+            factor_data.filter(pl.col("date") <= date),
+            date
+        )
+    except Exception as e:
+        return e
+
+
+def _precompute_rebalances(stock_data, factor_data, strategy_func, rebalance_dates, n_jobs=None):
+    """
+    Solve every rebalance date concurrently, or return None if the strategy
+    cannot run that way.
+
+    Strategies that set ``path_dependent = True`` (e.g. a turnover penalty
+    against current holdings) or cannot be pickled for the worker processes
+    fall back to the sequential path.
+    """
+    if getattr(strategy_func, 'path_dependent', False):
+        print("Strategy depends on previous holdings; rebalancing sequentially")
+        return None
+
+    try:
+        pickle.dumps(strategy_func)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        print(f"Strategy cannot be sent to worker processes ({e}); rebalancing sequentially")
+        return None
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(rebalance_dates))
+    print(f"Solving {len(rebalance_dates)} rebalances on {n_jobs} processes")
+
+    # Spawned workers avoid forking polars' thread pool; each keeps its own
+    # compiled optimization problem across the dates it solves
+    with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_rebalance_worker,
+            initargs=(stock_data, factor_data, strategy_func)
+    ) as executor:
+        chunksize = max(1, len(rebalance_dates) // (4 * n_jobs))
+        return dict(zip(rebalance_dates, executor.map(_solve_rebalance, rebalance_dates, chunksize=chunksize)))
+
+
+def backtest_strategy(
+        initial_capital,
+        stock_data,
+        factor_data,
+        strategy_func,
+        rebalance_frequency=21,  # Monthly in trading days
+        transaction_cost=0.0005,  # 5bps per trade
+        start_date=None,
+        end_date=None,
+        checkpoint_path=None,
+        checkpoint_every=12,  # Rebalances between checkpoints
+        resume=False,
+        parallel_rebalance=False,
+        n_jobs=None,
+        universe=None,
+        fingerprint=None
+):
+    """
+    Run a daily backtest of ``strategy_func``, rebalancing every
+    ``rebalance_frequency`` trading days.
+
+    With ``checkpoint_path`` set, the engine state is saved after every
+    ``checkpoint_every`` rebalances; ``resume=True`` continues from that
+    checkpoint and produces the same results as an uninterrupted run. History
+    records are appended to ``<checkpoint_path>.history`` in batches, so each
+    checkpoint writes only what happened since the last one. Optimizer
+    warm-start values and the ``state`` attribute of ``strategy_func``, if
+    any, are checkpointed and restored too. ``fingerprint`` (see
+    ``run_fingerprint``) identifies the strategy and inputs; a checkpoint is
+    only resumed by a run with the same fingerprint and settings.
+
+    With ``parallel_rebalance=True`` every rebalance is solved up front across
+    ``n_jobs`` processes and the daily P&L is then replayed with those
+    targets. This requires positions that depend only on the date's data;
+    strategies declaring ``path_dependent = True`` run sequentially.
+
+    Holdings in names the ``universe`` index (built from ``stock_data`` if
+    not given) marks as delisted are liquidated to cash at their last price,
+    paying the transaction cost; names in a data gap earn zero. Daily returns
+    come from the ``asset_returns`` column, or from prices via
+    ``calculate_returns`` when it is missing.
+    """
+    dates = _backtest_dates(stock_data, start_date, end_date)
+
     portfolio_value = initial_capital
     positions = {}
     portfolio_history = []
     turnover_history = []
     returns_history = []
+    start_index = 0
+
+    run_key = (
+        fingerprint, dates[0], dates[-1], len(dates),
+        initial_capital, rebalance_frequency, transaction_cost
+    )
+
+    history_path = f"{checkpoint_path}.history"
+    history_offset = 0
+    history_counts = (0, 0, 0)
+
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        state = load_checkpoint(checkpoint_path)
+        if state['run_key'] != run_key:
+            raise ValueError(f"Checkpoint {checkpoint_path} was written for a different backtest")
+
+        start_index = state['next_index']
+        portfolio_value = state['portfolio_value']
+        positions = state['positions']
+        history_offset = state['history_offset']
+        for batch in load_history(history_path, history_offset):
+            portfolio_history.extend(batch['portfolio_history'])
+            turnover_history.extend(batch['turnover_history'])
+            returns_history.extend(batch['returns_history'])
+        history_counts = (len(portfolio_history), len(turnover_history), len(returns_history))
+
+        restore_solver_state(state['solver_state'])
+        if state['strategy_state'] is not None:
+            strategy_func.state = state['strategy_state']
+
+        print(f"Resuming backtest from {dates[start_index]} ({start_index + 1}/{len(dates)})")
+
+    if universe is None:
+        universe = UniverseIndex.from_stock_data(stock_data)
+
+    # Dense next-day returns; gaps earn zero. Without an asset_returns column
+    # they are derived from prices, and calculate_returns raises if there
+    # are none
+    returns_data = stock_data
+    if "asset_returns" not in stock_data.columns:
+        returns_data = calculate_returns(stock_data.sort("symbol", "date"))
+    _, _, returns_panel = pivot_panel(returns_data, "asset_returns", universe.dates, universe.symbols)
+    returns_panel = np.where(np.isfinite(returns_panel), returns_panel, 0.0)
+
+    position_vec = _position_vector(positions, universe)
+
+    targets = None
+    if parallel_rebalance:
+        rebalance_dates = [dates[i] for i in range(start_index, len(dates)) if i % rebalance_frequency == 0]
+        if rebalance_dates:
+            targets = _precompute_rebalances(stock_data, factor_data, strategy_func, rebalance_dates, n_jobs)
 
     print(f"Starting backtest from {dates[0]} to {dates[-1]}")
     print(f"Initial capital: ${initial_capital:,.2f}")
@@ -42,27 +228,47 @@ def backtest_strategy(
     print(f"Transaction cost: {transaction_cost * 10000:.1f} bps")
 
     # Run backtest
-    for i, date in enumerate(dates):
+    for i in range(start_index, len(dates)):
+        date = dates[i]
         current_date_str = date.strftime("%Y-%m-%d")
         print(f"Processing date: {current_date_str} ({i + 1}/{len(dates)})", end="\r")
 
-        # Get data as of current date
-        current_stocks = stock_data.filter(pl.col("date") <= date)
-        current_factors = factor_data.filter(pl.col("date") <= date)
-
-        available_symbols = (current_stocks
-                             .filter(pl.col("date") == date)
-                             .select("symbol")
-                             .unique()["symbol"]
-                             .to_list())
+        # Liquidate holdings in names that will never trade again
+        delisted = universe.delisted(date) & (position_vec != 0)
+        if delisted.any():
+            turnover = np.sum(np.abs(position_vec[delisted]))
+            cost = turnover * transaction_cost
+            turnover_history.append({
+                'date': date,
+                'turnover': turnover / portfolio_value,
+                'cost': cost
+            })
+            portfolio_value -= cost
+            position_vec = np.where(delisted, 0.0, position_vec)
+            positions = _drop_masked(positions, delisted, universe)
+            print(f"\nLiquidated {int(delisted.sum())} delisted position(s) on {current_date_str}, "
+                  f"cost ${cost:,.2f}")
 
         should_rebalance = (i == 0) or (i % rebalance_frequency == 0)
 
         if should_rebalance:
             try:
-                new_positions, portfolio_stats = strategy_func(
-                    current_stocks, current_factors, date
-                )
+                if targets is not None:
+                    target = targets[date]
+                    if isinstance(target, Exception):
+                        raise target
+                    new_positions, portfolio_stats = target
+                else:
+                    # Get data as of current date
+                    current_stocks = stock_data.filter(pl.col("date") <= date)
+                    current_factors = factor_data.filter(pl.col("date") <= date)
+
+                    new_positions, portfolio_stats = strategy_func(
+                        current_stocks, current_factors, date
+                    )
+
+                # Delisted names cannot be bought
+                new_positions = _drop_masked(new_positions, universe.delisted(date), universe)
 
                 if positions:
                     turnover = 0
@@ -84,6 +290,7 @@ def backtest_strategy(
 
                 portfolio_value -= cost
                 positions = new_positions
+                position_vec = _position_vector(positions, universe)
 
                 portfolio_history.append({
                     "date": date,
@@ -122,30 +329,34 @@ def backtest_strategy(
         if next_date_idx < len(dates):
             next_date = dates[next_date_idx]
 
-            # Get returns for the next day
-            next_day_data = stock_data.filter(pl.col("date") == next_date)
-
-            if len(next_day_data) > 0:
-                # Calculate portfolio return
-                portfolio_return = 0
-
-                for ticker, position in positions.items():
-                    # Find next day's return for this stock
-                    stock_data_row = next_day_data.filter(pl.col("symbol") == ticker)
-
-                    if len(stock_data_row) > 0 and "asset_returns" in stock_data_row.columns:
-                        stock_return = stock_data_row["asset_returns"][0]
-
-                        if np.isfinite(stock_return):
+            # Portfolio return from the dense returns panel
+            portfolio_return = float(position_vec @ returns_panel[universe.row(next_date)]) / portfolio_value
 
-                            portfolio_return += (position / portfolio_value) * stock_return
-
-                returns_history.append({
-                    'date': next_date,
-                    'return': portfolio_return
-                })
+            returns_history.append({
+                'date': next_date,
+                'return': portfolio_return
+            })
 
-                portfolio_value *= (1 + portfolio_return)
+            portfolio_value *= (1 + portfolio_return)
+
+        if checkpoint_path and should_rebalance and (i // rebalance_frequency + 1) % checkpoint_every == 0:
+            # History goes first; the checkpoint then commits it by offset
+            history_offset = append_history(history_path, {
+                'portfolio_history': portfolio_history[history_counts[0]:],
+                'turnover_history': turnover_history[history_counts[1]:],
+                'returns_history': returns_history[history_counts[2]:],
+            }, history_offset)
+            history_counts = (len(portfolio_history), len(turnover_history), len(returns_history))
+
+            save_checkpoint(checkpoint_path, {
+                'run_key': run_key,
+                'next_index': i + 1,
+                'portfolio_value': portfolio_value,
+                'positions': positions,
+                'history_offset': history_offset,
+                'solver_state': solver_state(),
+                'strategy_state': getattr(strategy_func, 'state', None),
+            })
 
     print(f"\nBacktest completed. Final portfolio value: ${portfolio_value:,.2f}")
 
@@ -192,6 +403,7 @@ def backtest_strategy(
             'sharpe_ratio': sharpe_ratio,
             'max_drawdown': max_drawdown,
             'avg_turnover': np.mean([t['turnover'] for t in turnover_history]) if turnover_history else 0,
+            'turnover_history': turnover_history,
             'dates': dates,
             'portfolio_history': portfolio_history,
             'returns': returns_df["return"].to_numpy(),
@@ -206,6 +418,213 @@ def backtest_strategy(
             'absolute_return': portfolio_value - initial_capital,
             'return_pct': (portfolio_value / initial_capital) - 1,
             'portfolio_history': portfolio_history,
+            'turnover_history': turnover_history,
         }
 
-    return backtest_results
\ No newline at end of file
+    return backtest_results
+
+
+def history_weights(portfolio_history, symbols):
+    """
+    Position weights (position / portfolio value) as a states x symbols array.
+    """
+    symbol_idx = {symbol: j for j, symbol in enumerate(symbols)}
+
+    weights = np.zeros((len(portfolio_history), len(symbols)))
+    for t, state in enumerate(portfolio_history):
+        for ticker, position in state['positions'].items():
+            if ticker in symbol_idx:
+                weights[t, symbol_idx[ticker]] = position / state['portfolio_value']
+
+    return weights
+
+
+def performance_metrics(returns, years):
+    """
+    Vectorized performance metrics for one or many daily return series.
+
+    ``returns`` is indexed by date along the first axis; any trailing axes
+    (strategies, bootstrap paths, ...) are treated as independent series.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+
+    cum_returns = np.cumprod(1 + returns, axis=0) - 1
+
+    peak = np.maximum.accumulate(cum_returns + 1, axis=0) - 1
+    drawdowns = (cum_returns - peak) / (peak + 1)
+
+    annualized_return = (1 + cum_returns[-1]) ** (1 / years) - 1
+    annualized_volatility = np.std(returns, axis=0) * np.sqrt(252)
+    sharpe_ratio = np.divide(
+        annualized_return, annualized_volatility,
+        out=np.zeros_like(annualized_return), where=annualized_volatility > 0
+    )
+
+    return {
+        'return_pct': cum_returns[-1],
+        'annualized_return': annualized_return,
+        'annualized_volatility': annualized_volatility,
+        'sharpe_ratio': sharpe_ratio,
+        'max_drawdown': np.min(drawdowns, axis=0),
+    }
+
+
+def blend_panels(stock_data, factor_scores, score_cols, dates):
+    """
+    Dense inputs shared by every blend simulation.
+
+    Returns the symbols, a dates x symbols returns panel (missing returns
+    earn zero as in ``backtest_strategy``) and a dates x symbols x factors
+    panel of the latest score as of each date.
+    """
+    all_dates = stock_data.select("date").unique().sort("date")["date"].to_list()
+    symbols = stock_data.select("symbol").unique().sort("symbol")["symbol"].to_list()
+
+    _, _, returns_panel = pivot_panel(stock_data, "asset_returns", dates, symbols)
+    returns_panel = np.where(np.isfinite(returns_panel), returns_panel, 0.0)
+
+    date_rows = np.searchsorted(np.array(all_dates), np.array(dates))
+    _, _, scores = pivot_panel(factor_scores, list(score_cols), all_dates, symbols)
+    scores = forward_fill(scores)[date_rows]
+    scores = np.where(np.isfinite(scores), scores, 0.0)
+
+    return symbols, returns_panel, scores
+
+
+def simulate_blends(
+        returns_panel,
+        scores,
+        blend_weights,
+        initial_capital,
+        first=0,
+        last=None,
+        rebalance_frequency=21,
+        transaction_cost=0.0005,
+        max_position=0.15,
+        max_vol=None,
+        vol_lookback=252,
+        target_gmv=None
+):
+    """
+    Simulate S blends over panel rows ``first``..``last`` (inclusive).
+
+    Positions are set at ``first`` and every ``rebalance_frequency`` rows
+    after; returns cover rows ``first + 1``..``last``. With ``max_vol`` set,
+    each portfolio is scaled down so its annualized volatility under the
+    trailing ``vol_lookback``-day sample covariance stays below the cap.
+
+    Returns (strategy_returns, final_values, turnover), with one column per
+    strategy.
+    """
+    blend_weights = np.atleast_2d(np.asarray(blend_weights, dtype=np.float64))
+    if target_gmv is None:
+        target_gmv = initial_capital
+    if last is None:
+        last = len(returns_panel) - 1
+
+    n_strategies = blend_weights.shape[0]
+    rebalance_idx = np.arange(first, last + 1, rebalance_frequency)
+
+    portfolio_value = np.full(n_strategies, float(initial_capital))
+    positions = np.zeros((n_strategies, returns_panel.shape[1]))
+    strategy_returns = np.zeros((last - first, n_strategies))
+    turnover_history = np.zeros((len(rebalance_idx), n_strategies))
+
+    for k, start in enumerate(rebalance_idx):
+        alphas = scores[start] @ blend_weights.T
+        weights = alpha_weights(alphas, max_position)
+
+        if max_vol is not None:
+            # Only returns observed up to the rebalance date are used
+            history = returns_panel[max(0, start - vol_lookback + 1):start + 1]
+            if len(history) > 1:
+                cov = np.cov(history.T) * 252
+                vol = np.sqrt(np.maximum(np.sum(weights * (np.atleast_2d(cov) @ weights), axis=0), 0))
+                scale = np.minimum(1.0, np.divide(max_vol, vol, out=np.ones_like(vol), where=vol > 0))
+                weights = weights * scale
+
+        new_positions = weights.T * target_gmv
+
+        turnover = np.sum(np.abs(new_positions - positions), axis=1)
+        turnover_history[k] = turnover / portfolio_value
+        portfolio_value = portfolio_value - turnover * transaction_cost
+        positions = new_positions
+
+        # Dollar positions are held until the next rebalance, so value is a
+        # running sum of daily dollar P&L over the block
+        stop = rebalance_idx[k + 1] if k + 1 < len(rebalance_idx) else last
+        if stop <= start:
+            continue
+
+        pnl = returns_panel[start + 1:stop + 1] @ positions.T
+        values = portfolio_value + np.cumsum(pnl, axis=0)
+        prev_values = np.vstack([portfolio_value, values[:-1]])
+
+        strategy_returns[start - first:stop - first] = pnl / prev_values
+        portfolio_value = values[-1]
+
+    return strategy_returns, portfolio_value, turnover_history
+
+
+def backtest_blends(
+        initial_capital,
+        stock_data,
+        factor_scores,
+        blend_weights,
+        score_cols=("mom_score", "size_score", "value_score", "quality_score"),
+        rebalance_frequency=21,
+        transaction_cost=0.0005,
+        max_position=0.15,
+        max_vol=None,
+        target_gmv=None,
+        start_date=None,
+        end_date=None
+):
+    """
+    Backtest many factor blends at once over a shared dense returns panel.
+
+    ``blend_weights`` is an S x F matrix, one row of ``score_cols`` weights per
+    strategy. At every rebalance the S alpha vectors come from a single
+    (N x F) @ (F x S) product and are turned into positions with
+    ``alpha_weights``; P&L for all strategies is then accumulated block-wise
+    between rebalances, so cost grows far slower than one backtest per blend.
+    """
+    blend_weights = np.atleast_2d(np.asarray(blend_weights, dtype=np.float64))
+    if blend_weights.shape[1] != len(score_cols):
+        raise ValueError(
+            f"blend_weights has {blend_weights.shape[1]} columns, expected {len(score_cols)}"
+        )
+
+    dates = _backtest_dates(stock_data, start_date, end_date)
+    symbols, returns_panel, scores = blend_panels(stock_data, factor_scores, score_cols, dates)
+
+    print(f"Running {blend_weights.shape[0]} blends from {dates[0]} to {dates[-1]}")
+
+    strategy_returns, portfolio_value, turnover_history = simulate_blends(
+        returns_panel,
+        scores,
+        blend_weights,
+        initial_capital,
+        rebalance_frequency=rebalance_frequency,
+        transaction_cost=transaction_cost,
+        max_position=max_position,
+        max_vol=max_vol,
+        target_gmv=target_gmv
+    )
+
+    years = (dates[-1] - dates[0]).days / 365.25
+
+    metrics = {'strategy': np.arange(blend_weights.shape[0])}
+    for j, col in enumerate(score_cols):
+        metrics[col] = blend_weights[:, j]
+    metrics['final_value'] = portfolio_value
+    if len(strategy_returns) > 0 and years > 0:
+        metrics.update(performance_metrics(strategy_returns, years))
+    metrics['avg_turnover'] = turnover_history.mean(axis=0)
+
+    return {
+        'metrics': pl.DataFrame(metrics),
+        'dates': dates,
+        'symbols': symbols,
+        'returns': strategy_returns,
+    }
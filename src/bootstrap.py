@@ -0,0 +1,160 @@
+import os
+import itertools
+import multiprocessing
+import polars as pl
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.backtest import performance_metrics, history_weights
+
+
+def stationary_bootstrap_indices(n_obs, n_paths, mean_block=21, rng=None):
+    """
+    Draw stationary (Politis-Romano) block-bootstrap row indices.
+
+    Returns an n_paths x n_obs integer array. Blocks have geometric lengths
+    with mean ``mean_block`` and wrap around the end of the sample.
+    """
+    rng = np.random.default_rng(rng)
+
+    starts = rng.random((n_paths, n_obs)) < 1 / mean_block
+    starts[:, 0] = True
+    random_rows = rng.integers(0, n_obs, size=(n_paths, n_obs))
+
+    # Position of the most recent block start for every cell
+    t = np.arange(n_obs)
+    last_start = np.maximum.accumulate(np.where(starts, t, 0), axis=1)
+
+    block_rows = np.take_along_axis(random_rows, last_start, axis=1)
+
+    return (block_rows + t - last_start) % n_obs
+
+
+# Below this many path-days the chunks run in-process; spawning workers
+# (and importing the backtest stack in each) costs more than it saves
+MIN_PARALLEL_CELLS = 200_000_000
+
+# Returns vector or dates x dates matrix shared with pool workers, set once
+# per process by _init_bootstrap_worker rather than pickled with every chunk
+_BOOTSTRAP_RETURNS = {}
+
+
+def _init_bootstrap_worker(returns):
+    """
+    Install the shared returns in a pool worker.
+    """
+    _BOOTSTRAP_RETURNS['returns'] = returns
+
+
+def _bootstrap_chunk(n_paths, mean_block, years, seed):
+    """
+    Metric distributions for one chunk of bootstrap paths.
+
+    The shared returns are either a vector of strategy returns or the dates
+    x dates matrix of every day's asset returns under every day's weights.
+    """
+    returns = _BOOTSTRAP_RETURNS['returns']
+    n_obs = returns.shape[0]
+    idx = stationary_bootstrap_indices(n_obs, n_paths, mean_block, seed)
+
+    if returns.ndim == 1:
+        # Strategy returns: dates x paths
+        paths = returns[idx.T]
+    else:
+        # Day t of a path earns the resampled day's asset returns under the
+        # original weights of day t
+        paths = returns[idx.T, np.arange(n_obs)[:, None]]
+
+    return performance_metrics(paths, years)
+
+
+def bootstrap_metrics(
+        returns,
+        years,
+        weights=None,
+        n_paths: int = 5000,
+        mean_block: int = 21,
+        chunk_size: int = 500,
+        n_jobs=None,
+        seed=None
+):
+    """
+    Stationary block-bootstrap distributions of backtest metrics.
+
+    With ``weights`` of None, ``returns`` are the strategy's daily returns.
+    Otherwise ``returns`` is a dates x symbols asset returns panel and
+    ``weights`` the matching dates x symbols position weights, so each path
+    re-runs the position schedule on resampled asset returns. Every
+    (resampled day, weights day) pair is precomputed once as a dates x dates
+    matrix, so chunks gather from it instead of materialising paths x dates x
+    symbols. Paths are generated in chunks of ``chunk_size`` to bound memory.
+    Chunks are spread over ``n_jobs`` processes, which receive the returns
+    once through the pool initializer. With ``n_jobs`` of None, jobs smaller
+    than ``MIN_PARALLEL_CELLS`` path-days run in-process.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = np.where(np.isfinite(returns), returns, 0.0)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.shape != returns.shape:
+            raise ValueError("weights must have the same shape as the returns panel")
+        weights = np.where(np.isfinite(weights), weights, 0.0)
+        returns = returns @ weights.T
+
+    chunk_sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        chunk_sizes.append(n_paths % chunk_size)
+
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    if n_jobs is None and n_paths * returns.shape[0] < MIN_PARALLEL_CELLS:
+        n_jobs = 1
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(chunk_sizes))
+
+    if n_jobs <= 1:
+        _init_bootstrap_worker(returns)
+        chunks = [
+            _bootstrap_chunk(size, mean_block, years, s)
+            for size, s in zip(chunk_sizes, seeds)
+        ]
+    else:
+        with ProcessPoolExecutor(
+                max_workers=n_jobs,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_bootstrap_worker,
+                initargs=(returns,)
+        ) as executor:
+            chunks = list(executor.map(
+                _bootstrap_chunk, chunk_sizes, itertools.repeat(mean_block),
+                itertools.repeat(years), seeds
+            ))
+
+    return {
+        metric: np.concatenate([chunk[metric] for chunk in chunks])
+        for metric in chunks[0]
+    }
+
+
+def position_weights(backtest_results, symbols):
+    """
+    Daily position weights aligned with ``backtest_results['returns']``.
+
+    Row t holds the weights earning the return of ``dates[t + 1]``.
+    """
+    return history_weights(backtest_results['portfolio_history'][:-1], symbols)
+
+
+def confidence_intervals(distributions, confidence=0.90):
+    """
+    Percentile confidence intervals for each bootstrapped metric.
+    """
+    tail = (1 - confidence) / 2
+
+    return pl.DataFrame([
+        {
+            'metric': metric,
+            'lower': np.nanquantile(values, tail),
+            'median': np.nanquantile(values, 0.5),
+            'upper': np.nanquantile(values, 1 - tail),
+        }
+        for metric, values in distributions.items()
+    ])
@@ -0,0 +1,93 @@
+import io
+import os
+import gzip
+import pickle
+import hashlib
+import tempfile
+from pathlib import Path
+
+
+def save_checkpoint(path, state):
+    """
+    Atomically write a backtest checkpoint as a compressed pickle.
+
+    The state is written to a temporary file in the same directory and moved
+    into place, so a crash mid-write never leaves a truncated checkpoint.
+    """
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True, parents=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path):
+    """
+    Load a checkpoint written by ``save_checkpoint``.
+    """
+    with gzip.open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def append_history(path, records, offset=0):
+    """
+    Append one batch of history records to an append-only log.
+
+    The log is first truncated to ``offset`` (the size recorded by the last
+    committed checkpoint), so a batch written by a run that crashed before
+    saving its checkpoint is discarded. Returns the new committed size.
+    """
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True, parents=True)
+
+    with open(path, "ab") as raw:
+        raw.truncate(offset)
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+            pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+        raw.flush()
+        os.fsync(raw.fileno())
+        return raw.tell()
+
+
+def load_history(path, offset):
+    """
+    Read every batch written by ``append_history`` in the first ``offset`` bytes.
+    """
+    with open(path, "rb") as raw:
+        data = raw.read(offset)
+
+    batches = []
+    with gzip.GzipFile(fileobj=io.BytesIO(data), mode="rb") as f:
+        while True:
+            try:
+                batches.append(pickle.load(f))
+            except EOFError:
+                break
+    return batches
+
+
+def run_fingerprint(name, settings=None, *frames):
+    """
+    Stable hash identifying a backtest run: the strategy ``name``, its
+    ``settings`` and the contents of the input ``frames``.
+
+    Passed to ``backtest_strategy`` so a checkpoint is only resumed by the
+    run that wrote it.
+    """
+    digest = hashlib.sha256(repr(name).encode())
+    digest.update(repr(sorted((settings or {}).items())).encode())
+    for frame in frames:
+        digest.update(repr(frame.schema).encode())
+        digest.update(frame.hash_rows(seed=0).to_numpy().tobytes())
+
+    return digest.hexdigest()
@@ -0,0 +1,105 @@
+import time
+import polars as pl
+import numpy as np
+
+from src.data import pivot_panel
+from src.factors import factor_mom, factor_size, factor_value, factor_quality
+from src.portfolio import calculate_returns
+
+
+def _timed(func, repeat=3):
+    """
+    Best wall time of ``func`` over ``repeat`` runs.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _pipeline_steps(stocks_data):
+    """
+    Timed stages of ``main.run_portfolio_system`` on one representation:
+    the factor functions, the factor-score joins and the backtest pivots.
+    """
+    returns_data = calculate_returns(stocks_data)
+    scores = [
+        factor_mom(returns_data), factor_size(stocks_data),
+        factor_value(stocks_data), factor_quality(stocks_data, returns_data),
+    ]
+
+    def join_scores():
+        factor_scores = scores[0]
+        for score in scores[1:]:
+            factor_scores = factor_scores.join(score, on=["date", "symbol"])
+        return factor_scores
+
+    return {
+        'calculate_returns': lambda: calculate_returns(stocks_data),
+        'factor_mom': lambda: factor_mom(returns_data),
+        'factor_size': lambda: factor_size(stocks_data),
+        'factor_value': lambda: factor_value(stocks_data),
+        'factor_quality': lambda: factor_quality(stocks_data, returns_data),
+        'join_factor_scores': join_scores,
+        'pivot_returns': lambda: pivot_panel(returns_data, "asset_returns"),
+        'pivot_universe': lambda: pivot_panel(stocks_data, "prccd"),
+    }
+
+
+def compact_report(stocks_full, stocks_compact, repeat=3):
+    """
+    Precision impact and measured savings of the compact stock panel.
+
+    Both frames are loader output (``compact=False`` and ``compact=True``).
+    Returns a per-column table of dtypes, bytes and max absolute/relative
+    error, plus a table timing each pipeline stage (factor functions,
+    factor-score joins, backtest pivots) on both representations.
+    """
+    rows = []
+    for col in stocks_full.columns:
+        before = stocks_full[col]
+        after = stocks_compact[col] if col in stocks_compact.columns else None
+        row = {
+            'column': col,
+            'dtype_before': str(before.dtype),
+            'dtype_after': str(after.dtype) if after is not None else 'dropped',
+            'bytes_before': before.estimated_size(),
+            'bytes_after': after.estimated_size() if after is not None else 0,
+            'max_abs_error': None,
+            'max_rel_error': None,
+        }
+        if after is not None and before.dtype.is_numeric() and after.dtype.is_numeric():
+            exact = before.cast(pl.Float64).to_numpy()
+            approx = after.cast(pl.Float64).to_numpy()
+            err = np.abs(exact - approx)
+            finite = np.isfinite(err)
+            if finite.any():
+                row['max_abs_error'] = float(err[finite].max())
+                rel = err[finite] / np.maximum(np.abs(exact[finite]), np.finfo(np.float64).tiny)
+                row['max_rel_error'] = float(rel.max())
+        rows.append(row)
+
+    columns = pl.DataFrame(rows)
+
+    steps_full = _pipeline_steps(stocks_full)
+    steps_compact = _pipeline_steps(stocks_compact)
+
+    timings = pl.DataFrame([
+        {
+            'operation': name,
+            'seconds_full': _timed(steps_full[name], repeat),
+            'seconds_compact': _timed(steps_compact[name], repeat),
+        }
+        for name in steps_full
+    ]).with_columns(
+        (pl.col("seconds_full") / pl.col("seconds_compact")).alias("speedup")
+    )
+
+    return {
+        'columns': columns,
+        'timings': timings,
+        'bytes_before': stocks_full.estimated_size(),
+        'bytes_after': stocks_compact.estimated_size(),
+    }
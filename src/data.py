@@ -1,9 +1,36 @@
 import polars as pl
+import numpy as np
+from datetime import datetime
 
 
-def load_and_process_data(stock_files, factor_file):
+# Columns read by the factor, risk and backtest code; the rest can be
+# dropped with compact_stocks(..., keep_columns=COMPACT_COLUMNS)
+COMPACT_COLUMNS = [
+    "symbol", "date", "prccd", "cshoc", "eps", "div", "cshtrd",
+    "gsector", "gind", "market_cap",
+]
+
+# Price-derived fields that tolerate float32 precision
+FLOAT32_COLUMNS = [
+    "prccd", "prchd", "prcld", "eps", "div", "ajexdi", "trfd",
+    "market_cap", "book_price", "turnover", "div_yield",
+]
+
+
+def load_and_process_data(stock_files, factor_file, start_date=None, end_date=None, compact=False,
+                          keep_columns=None):
     """
     Load and process stock and factor data using polars for performance.
+
+    ``tic``/``datadate`` are renamed to ``symbol``/``date``, dates are parsed
+    to ``pl.Date`` and both frames are limited to ``start_date`` and
+    ``end_date`` (``YYYY-MM-DD`` strings or dates) when given.
+
+    With ``compact=True`` only dtypes change: ``symbol`` becomes an Enum over
+    a global ticker dictionary, price-derived fields float32 and small
+    integer codes are downcast (see ``compact_stocks``). ``keep_columns``
+    (e.g. ``COMPACT_COLUMNS``) also drops the stock columns the pipeline
+    never reads.
     """
     stocks_df = pl.read_csv(stock_files)
 
@@ -11,9 +38,11 @@ def load_and_process_data(stock_files, factor_file):
         "tic", "datadate", "prccd", "prchd", "prcld", "cshoc",
         "eps", "gsector", "gind", "gsubind", "sic",
         "cshtrd", "div", "ajexdi", "exchg", "trfd"
-    ])
+    ]).rename({"tic": "symbol", "datadate": "date"})
 
     stocks_data = stocks_data.with_columns([
+        _to_date("date", stocks_data.schema["date"]).alias("date"),
+
         # Market cap (shares outstanding * price)
         (pl.col("cshoc") * pl.col("prccd")).alias("market_cap"),
 
@@ -28,5 +57,131 @@ def load_and_process_data(stock_files, factor_file):
     ])
 
     factors_df = pl.read_csv(factor_file)
+    if "date" in factors_df.columns:
+        factors_df = factors_df.with_columns(_to_date("date", factors_df.schema["date"]).alias("date"))
+
+    in_range = pl.lit(True)
+    if start_date is not None:
+        in_range &= pl.col("date") >= _as_date(start_date)
+    if end_date is not None:
+        in_range &= pl.col("date") <= _as_date(end_date)
+
+    stocks_data = stocks_data.filter(in_range)
+    if "date" in factors_df.columns:
+        factors_df = factors_df.filter(in_range)
+
+    if compact:
+        stocks_data = compact_stocks(stocks_data, keep_columns=keep_columns)
+        factors_df = compact_factors(factors_df)
+    elif keep_columns is not None:
+        stocks_data = stocks_data.select([c for c in keep_columns if c in stocks_data.columns])
+
+    return stocks_data, factors_df
+
+
+def _as_date(value):
+    """
+    ``value`` as a date; strings are parsed as ``YYYY-MM-DD``.
+    """
+    if isinstance(value, str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    return value
+
+
+def _to_date(col, dtype):
+    """
+    Parse a date column stored as YYYYMMDD integers or ISO strings.
+    """
+    if dtype == pl.Date:
+        return pl.col(col)
+    if dtype.is_integer():
+        return pl.col(col).cast(pl.Utf8).str.strptime(pl.Date, "%Y%m%d")
+    if dtype == pl.Utf8:
+        return pl.col(col).str.to_date()
+    return pl.col(col).cast(pl.Date)
+
+
+def _downcast_int(series):
+    """
+    Smallest integer dtype holding every value of ``series``.
+    """
+    lo, hi = series.min(), series.max()
+    if lo is None:
+        return pl.Int32
+    for dtype, bound in ((pl.Int16, 2 ** 15), (pl.Int32, 2 ** 31)):
+        if -bound <= lo and hi < bound:
+            return dtype
+    return pl.Int64
+
+
+def compact_stocks(stocks_data, keep_columns=None):
+    """
+    Compact representation of the stock panel produced by the loader.
+
+    Only dtypes change; pass ``keep_columns`` (e.g. ``COMPACT_COLUMNS``) to
+    also drop the columns the pipeline never reads.
+    """
+    symbols = pl.Enum(sorted(stocks_data["symbol"].drop_nulls().unique().cast(pl.Utf8).to_list()))
+
+    casts = [pl.col("symbol").cast(pl.Utf8).cast(symbols)]
+    for col, dtype in stocks_data.schema.items():
+        if col in ("symbol", "date"):
+            continue
+        if col in FLOAT32_COLUMNS and dtype.is_numeric():
+            casts.append(pl.col(col).cast(pl.Float32))
+        elif dtype.is_integer():
+            casts.append(pl.col(col).cast(_downcast_int(stocks_data[col])))
+
+    stocks_data = stocks_data.with_columns(casts)
+
+    if keep_columns is not None:
+        stocks_data = stocks_data.select([c for c in keep_columns if c in stocks_data.columns])
+
+    return stocks_data
+
+
+def compact_factors(factors_df):
+    """
+    Compact representation of the factor returns file.
+    """
+    return factors_df.with_columns([
+        pl.col(col).cast(pl.Float32)
+        for col, dtype in factors_df.schema.items()
+        if dtype.is_float()
+    ])
+
+
+def pivot_panel(df, value_col, dates=None, symbols=None, fill_value=np.nan):
+    """
+    Pivot a long (date, symbol) frame into a dense dates x symbols array.
+
+    Passing a list of columns returns a dates x symbols x columns array from
+    a single join.
+    """
+    if dates is None:
+        dates = df.select("date").unique().sort("date")["date"].to_list()
+    if symbols is None:
+        symbols = df.select("symbol").unique().sort("symbol")["symbol"].to_list()
+
+    value_cols = [value_col] if isinstance(value_col, str) else list(value_col)
+
+    # Match key dtypes so Enum symbols / Date columns join directly
+    date_idx = pl.DataFrame({"date": pl.Series(dates, dtype=df.schema["date"])}).with_row_index("_row")
+    symbol_idx = pl.DataFrame({"symbol": pl.Series(symbols, dtype=df.schema["symbol"])}).with_row_index("_col")
+
+    cells = (
+        df
+        .select("date", "symbol", *value_cols)
+        .join(date_idx, on="date")
+        .join(symbol_idx, on="symbol")
+    )
+
+    panel = np.full((len(dates), len(symbols), len(value_cols)), fill_value, dtype=np.float64)
+    panel[cells["_row"].to_numpy(), cells["_col"].to_numpy()] = (
+        cells.select(pl.col(value_cols).cast(pl.Float64).fill_null(fill_value)).to_numpy()
+    )
+
+    if isinstance(value_col, str):
+        panel = panel[..., 0]
 
-    return stocks_data, factors_df
\ No newline at end of file
+    return dates, symbols, panel
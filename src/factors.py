@@ -1,6 +1,6 @@
 import polars as pl
 import numpy as np
-from math_utils import exp_weights, center_xsection, winsorize
+from src.math_utils import exp_weights, center_xsection, winsorize
 
 
 def factor_mom(returns_df, trailing_days=252, half_life=126, lag=20):
@@ -34,4 +34,21 @@ def exp_weights(window, half_life):
     Generate exponentially decaying weights.
     """
     decay = np.log(2) / half_life
-    return np.exp(-decay * np.arange(window))[::-1]
\ No newline at end of file
+    return np.exp(-decay * np.arange(window))[::-1]
+
+
+def forward_fill(data):
+    """
+    Carry the last finite value forward along the first axis.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    valid = np.isfinite(data)
+
+    shape = (-1,) + (1,) * (data.ndim - 1)
+    idx = np.where(valid, np.arange(data.shape[0]).reshape(shape), 0)
+    idx = np.maximum.accumulate(idx, axis=0)
+
+    filled = np.take_along_axis(data, idx, axis=0)
+    seen = np.maximum.accumulate(valid, axis=0)
+
+    return np.where(seen, filled, np.nan)
@@ -72,19 +72,30 @@ def plot_risk_decomposition(portfolio_stats_history):
     return plt.gcf()
 
 
-def create_performance_report(backtest_results, attribution_results, benchmark_returns=None):
+def create_performance_report(backtest_results, attribution_results, benchmark_returns=None,
+                              confidence_intervals=None):
     """
     Generate comprehensive performance report.
+
+    ``confidence_intervals`` is the table from ``src.bootstrap.confidence_intervals``;
+    when given, the Sharpe and drawdown panels show the bootstrapped bands.
     """
+    intervals = {}
+    if confidence_intervals is not None:
+        intervals = {row['metric']: row for row in confidence_intervals.iter_rows(named=True)}
+
+    # Daily return series start on the second backtest date
+    return_dates = backtest_results['dates'][1:]
+
     # Create performance dashboard
     fig = plt.figure(figsize=(15, 12))
 
     # 1. Cumulative return plot
     ax1 = plt.subplot2grid((3, 2), (0, 0), colspan=2)
-    ax1.plot(backtest_results['dates'], backtest_results['cumulative_returns'],
+    ax1.plot(return_dates, backtest_results['cumulative_returns'],
              label='Strategy', linewidth=2)
     if benchmark_returns is not None:
-        ax1.plot(backtest_results['dates'], benchmark_returns,
+        ax1.plot(return_dates, benchmark_returns,
                  label='Benchmark', linewidth=2, linestyle='--')
     ax1.set_title('Cumulative Performance', fontsize=14)
     ax1.legend()
@@ -97,27 +108,40 @@ def create_performance_report(backtest_results, attribution_results, benchmark_r
     factor_pcts.append(attribution_results['specific_pct'])
     factors.append('Specific')
 
+    # Bars rather than a pie: contributions can be negative
     colors = plt.cm.viridis(np.linspace(0, 1, len(factors)))
-    ax2.pie(factor_pcts, labels=factors, autopct='%1.1f%%',
-            startangle=90, colors=colors)
+    ax2.barh(factors, factor_pcts, color=colors)
+    ax2.axvline(x=0, color='black', linewidth=0.8)
+    ax2.xaxis.set_major_formatter(plt.FuncFormatter(lambda x, _: f"{x:.0%}"))
     ax2.set_title('Return Attribution', fontsize=14)
 
     # 3. Rolling Sharpe ratio
     ax3 = plt.subplot2grid((3, 2), (1, 1))
-    ax3.plot(backtest_results['dates'][63:], backtest_results['rolling_sharpe'],
+    rolling_sharpe = backtest_results['rolling_sharpe']
+    ax3.plot(return_dates[62:62 + len(rolling_sharpe)], rolling_sharpe,
              label='Rolling Sharpe (3m)', linewidth=2)
     ax3.axhline(y=backtest_results['sharpe_ratio'], color='r',
                 linestyle='--', label=f'Overall Sharpe: {backtest_results["sharpe_ratio"]:.2f}')
+    if 'sharpe_ratio' in intervals:
+        band = intervals['sharpe_ratio']
+        ax3.axhspan(band['lower'], band['upper'], color='r', alpha=0.1,
+                    label=f'Sharpe CI: [{band["lower"]:.2f}, {band["upper"]:.2f}]')
     ax3.set_title('Rolling Sharpe Ratio', fontsize=14)
     ax3.legend()
     ax3.grid(alpha=0.3)
 
     # 4. Drawdown chart
     ax4 = plt.subplot2grid((3, 2), (2, 0))
-    ax4.fill_between(backtest_results['dates'], backtest_results['drawdowns'],
+    ax4.fill_between(return_dates, backtest_results['drawdowns'],
                      0, color='red', alpha=0.3)
     ax4.set_title('Drawdowns', fontsize=14)
     ax4.set_ylim(min(backtest_results['drawdowns']) * 1.1, 0)
+    if 'max_drawdown' in intervals:
+        band = intervals['max_drawdown']
+        ax4.axhspan(band['lower'], band['upper'], color='grey', alpha=0.2,
+                    label=f'Max drawdown CI: [{band["lower"]:.1%}, {band["upper"]:.1%}]')
+        ax4.set_ylim(min(min(backtest_results['drawdowns']), band['lower']) * 1.1, 0)
+        ax4.legend()
     ax4.grid(alpha=0.3)
 
     # 5. Monthly returns heatmap
@@ -2,6 +2,71 @@ import polars as pl
 import numpy as np
 import cvxpy as cp
 
+from src.pretrade import PreTradeRisk
+
+
+# Compiled problems keyed by shape and settings; each process (including
+# pool workers) builds a problem once and re-solves it with new parameters
+_PROBLEM_CACHE = {}
+
+# Warm-start values restored from a checkpoint for problems not built yet
+_PENDING_WARM_START = {}
+
+
+def _portfolio_problem(n_stocks, n_factors, max_vol, factor_limits):
+    """
+    Build (or fetch) a parametrized, DPP-compliant portfolio problem.
+    """
+    key = (n_stocks, n_factors, max_vol, factor_limits)
+    if key in _PROBLEM_CACHE:
+        return _PROBLEM_CACHE[key]
+
+    weights = cp.Variable(n_stocks)
+    params = {
+        'alphas': cp.Parameter(n_stocks),
+        'exposures': cp.Parameter((n_factors, n_stocks)),
+        # Square root of the factor covariance applied to the exposures, so
+        # factor risk is a sum of squares of an affine expression
+        'factor_loadings': cp.Parameter((n_factors, n_stocks)),
+        'specific_vol': cp.Parameter(n_stocks, nonneg=True),
+        # max_position for tradable names, zero for the rest
+        'position_cap': cp.Parameter(n_stocks, nonneg=True),
+    }
+
+    # Objective: maximize alpha (expected return)
+    objective = cp.Maximize(params['alphas'] @ weights)
+
+    # Constraints
+    constraints = [
+        # Budget constraint (gross exposure; the optimum is normally at the bound)
+        cp.norm1(weights) <= 1,
+
+        # Position size constraints
+        weights >= -params['position_cap'],
+        weights <= params['position_cap'],
+    ]
+
+    # Add factor exposure constraints
+    for i, max_exposure in enumerate(factor_limits[:n_factors]):
+        factor_exposure = params['exposures'][i] @ weights
+        constraints.extend([
+            factor_exposure >= -max_exposure,
+            factor_exposure <= max_exposure
+        ])
+
+    # Total risk constraint
+    constraints.append(cp.norm(cp.hstack([
+        params['factor_loadings'] @ weights,
+        cp.multiply(params['specific_vol'], weights)
+    ])) <= max_vol)
+
+    problem = cp.Problem(objective, constraints)
+    if key in _PENDING_WARM_START:
+        weights.value = _PENDING_WARM_START.pop(key)
+    _PROBLEM_CACHE[key] = (problem, weights, params)
+
+    return _PROBLEM_CACHE[key]
+
 
 def construct_portfolio(
         alphas,
@@ -12,14 +77,23 @@ def construct_portfolio(
         max_position: float = 0.15,
         max_vol: float = 0.15,  # Adding the missing parameter
         risk_aversion: float = 1.0,
-        factor_constraints=None
+        factor_constraints=None,
+        tradable=None
 ):
     """
     Construct an optimal biotech portfolio with sophisticated risk controls.
 
     Uses convex optimization to maximize alpha subject to risk constraints.
+    The problem is compiled once per shape and settings and re-solved with
+    new parameter values on later calls, warm-started from the previous
+    solution. Names where the boolean
+    ``tradable`` mask is False are held at zero weight.
     """
-    n_stocks = len(alphas)
+    alphas = np.asarray(alphas, dtype=np.float64)
+    factor_exposures = np.asarray(factor_exposures, dtype=np.float64)
+    factor_covariance = np.asarray(factor_covariance, dtype=np.float64)
+    specific_risk = np.asarray(specific_risk, dtype=np.float64)
+    n_stocks, n_factors = factor_exposures.shape
 
     # Default factor constraints if none provided
     if factor_constraints is None:
@@ -32,41 +106,25 @@ def construct_portfolio(
             'umd': 0.3  # Momentum (±30%)
         }
 
-    # Setup optimization variables and constraints
-    weights = cp.Variable(n_stocks)
-
-    # Objective: maximize alpha (expected return)
-    objective = cp.Maximize(alphas @ weights)
+    problem, weights, params = _portfolio_problem(
+        n_stocks, n_factors, max_vol, tuple(factor_constraints.values())
+    )
 
-    # Risk calculations
-    factor_risk = cp.quad_form(factor_exposures @ weights, factor_covariance)
-    specific_risk_contrib = cp.sum(cp.multiply(cp.square(weights), specific_risk))
+    eigvals, eigvecs = np.linalg.eigh(factor_covariance)
+    cov_sqrt = eigvecs * np.sqrt(np.maximum(eigvals, 0))
 
-    # Constraints
-    constraints = [
-        # Budget constraint
-        cp.sum(cp.abs(weights)) == 1,
+    params['alphas'].value = alphas
+    params['exposures'].value = factor_exposures.T
+    params['factor_loadings'].value = cov_sqrt.T @ factor_exposures.T
+    params['specific_vol'].value = np.sqrt(np.maximum(specific_risk, 0))
 
-        # Position size constraints
-        weights >= -max_position,
-        weights <= max_position,
-    ]
+    position_cap = np.full(n_stocks, float(max_position))
+    if tradable is not None:
+        position_cap = np.where(np.asarray(tradable, dtype=bool), position_cap, 0.0)
+    params['position_cap'].value = position_cap
 
-    # Add factor exposure constraints
-    for i, factor in enumerate(factor_constraints.keys()):
-        max_exposure = factor_constraints[factor]
-        factor_exposure = factor_exposures[:, i] @ weights
-        constraints.extend([
-            factor_exposure >= -max_exposure,
-            factor_exposure <= max_exposure
-        ])
-
-    # Total risk constraint (optional)
-    constraints.append(cp.sqrt(factor_risk + specific_risk_contrib) <= max_vol)
-
-    # Solve optimization problem
-    problem = cp.Problem(objective, constraints)
-    problem.solve()
+    # Solve optimization problem, starting from the previous solution
+    problem.solve(warm_start=True)
 
     if problem.status != 'optimal':
         print(f"Warning: Optimization problem status: {problem.status}")
@@ -75,22 +133,41 @@ def construct_portfolio(
     positions = weights.value * target_gmv
 
     # Calculate portfolio statistics
+    risk = PreTradeRisk(factor_exposures, factor_covariance, specific_risk).portfolio_risk(weights.value)
     portfolio_stats = {
         'gmv': target_gmv,
         'expected_return': alphas @ weights.value,
-        'factor_exposures': factor_exposures.T @ weights.value,
-        'factor_risk': np.sqrt(
-            weights.value.T @ factor_exposures @ factor_covariance @ factor_exposures.T @ weights.value),
-        'specific_risk': np.sqrt(np.sum(weights.value ** 2 * specific_risk)),
-        'total_risk': np.sqrt(
-            weights.value.T @ factor_exposures @ factor_covariance @ factor_exposures.T @ weights.value +
-            np.sum(weights.value ** 2 * specific_risk)
-        )
+        **risk
     }
 
     return positions, portfolio_stats
 
 
+def solver_state():
+    """
+    Last solution of every cached portfolio problem, keyed like the cache.
+
+    Checkpointed by ``backtest_strategy`` so a resumed run warm-starts from
+    the same point as an uninterrupted one.
+    """
+    return {
+        key: weights.value.copy()
+        for key, (_, weights, _) in _PROBLEM_CACHE.items()
+        if weights.value is not None
+    }
+
+
+def restore_solver_state(state):
+    """
+    Warm-start cached (or later built) portfolio problems from ``solver_state()``.
+    """
+    for key, value in (state or {}).items():
+        if key in _PROBLEM_CACHE:
+            _PROBLEM_CACHE[key][1].value = value
+        else:
+            _PENDING_WARM_START[key] = value
+
+
 def calculate_returns(stocks_data: pl.DataFrame) -> pl.DataFrame:
 
     if "asset_returns" in stocks_data.columns:
@@ -110,4 +187,33 @@ def calculate_returns(stocks_data: pl.DataFrame) -> pl.DataFrame:
 
     returns_df = returns_df.filter(pl.col("asset_returns").is_not_null())
 
-    return returns_df
\ No newline at end of file
+    return returns_df
+
+
+def alpha_weights(alphas, max_position: float = 0.15, n_iter: int = 20):
+    """
+    Closed-form alpha-proportional weights for one or many alpha vectors.
+
+    Each column of ``alphas`` is scaled to unit gross exposure and clipped to
+    ``max_position``; clipped weight is redistributed over the remaining names.
+    Cheap enough to run for thousands of strategies at once, unlike
+    ``construct_portfolio`` which solves one convex problem per call.
+    """
+    alphas = np.asarray(alphas, dtype=np.float64)
+    alphas = np.where(np.isfinite(alphas), alphas, 0.0)
+
+    weights = alphas
+    for _ in range(n_iter):
+        gross = np.sum(np.abs(weights), axis=0, keepdims=True)
+        weights = np.divide(weights, gross, out=np.zeros_like(weights), where=gross > 0)
+        clipped = np.clip(weights, -max_position, max_position)
+        if np.allclose(clipped, weights):
+            break
+        # Grow the unclipped names so the next pass restores unit gross
+        free = np.abs(weights) < max_position
+        excess = np.sum(np.abs(weights) - np.abs(clipped), axis=0, keepdims=True)
+        free_gross = np.sum(np.abs(clipped) * free, axis=0, keepdims=True)
+        scale = np.divide(excess, free_gross, out=np.zeros_like(free_gross), where=free_gross > 0)
+        weights = np.where(free, clipped * (1 + scale), clipped)
+
+    return np.clip(weights, -max_position, max_position)
@@ -0,0 +1,136 @@
+import numpy as np
+
+
+class PreTradeRisk:
+    """
+    Pre-trade risk and what-if queries against a factor risk model.
+
+    Covariance is never formed as an N x N matrix: with exposures B (N x K),
+    factor covariance F and specific variances d, every query works through
+    x = B'w, so a full portfolio query costs O(NK) and a trade touching m
+    names costs O(mK + K^2) against the current portfolio. The N x K product
+    BF is computed once per model, and ``set_portfolio`` caches the current
+    portfolio's x, covariance-times-weights and risk for later queries.
+
+    Weights are fractions of GMV, i.e. positions from ``construct_portfolio``
+    divided by ``target_gmv``.
+    """
+
+    def __init__(self, exposures, factor_cov, specific_risk, symbols=None, factor_names=None):
+        self.exposures = np.ascontiguousarray(exposures, dtype=np.float64)
+        self.factor_cov = np.ascontiguousarray(factor_cov, dtype=np.float64)
+        self.specific_var = np.asarray(specific_risk, dtype=np.float64)
+
+        n_stocks, n_factors = self.exposures.shape
+        if self.factor_cov.shape != (n_factors, n_factors):
+            raise ValueError("factor_cov must be K x K for N x K exposures")
+        if self.specific_var.shape != (n_stocks,):
+            raise ValueError("specific_risk must have one entry per stock")
+
+        self.symbols = list(symbols) if symbols is not None else None
+        self.factor_names = list(factor_names) if factor_names is not None else None
+        self._symbol_idx = {s: i for i, s in enumerate(self.symbols or [])}
+
+        # BF, so Cov @ w = BF @ x + d * w
+        self._exposures_cov = self.exposures @ self.factor_cov
+
+        self.set_portfolio(np.zeros(n_stocks))
+
+    def set_portfolio(self, weights):
+        """
+        Set the current holdings that what-if queries are measured against.
+        """
+        self.weights = self._as_vector(weights)
+        self._factor_exposure = self.exposures.T @ self.weights
+        self._specific_var = float(self.specific_var @ self.weights ** 2)
+        self._cov_w = self._exposures_cov @ self._factor_exposure + self.specific_var * self.weights
+        self._risk = self.portfolio_risk(self.weights)
+
+    def portfolio_risk(self, weights=None):
+        """
+        Factor, specific and total risk of a portfolio (default: current).
+        """
+        if weights is None:
+            return dict(self._risk)
+
+        weights = self._as_vector(weights)
+        factor_exposure = self.exposures.T @ weights
+        specific_var = float(self.specific_var @ weights ** 2)
+
+        factor_var = float(factor_exposure @ self.factor_cov @ factor_exposure)
+
+        return {
+            'factor_exposures': factor_exposure,
+            'factor_risk': np.sqrt(factor_var),
+            'specific_risk': np.sqrt(specific_var),
+            'total_risk': np.sqrt(factor_var + specific_var),
+        }
+
+    def risk_contributions(self, weights=None):
+        """
+        Marginal and component contributions to total risk per name.
+
+        Component contributions sum to total risk.
+        """
+        if weights is None:
+            weights, cov_w = self.weights, self._cov_w
+        else:
+            weights = self._as_vector(weights)
+            cov_w = self._exposures_cov @ (self.exposures.T @ weights) + self.specific_var * weights
+        total_risk = np.sqrt(weights @ cov_w)
+
+        marginal = cov_w / total_risk if total_risk > 0 else np.zeros_like(cov_w)
+
+        return {
+            'marginal': marginal,
+            'component': weights * marginal,
+            'total_risk': total_risk,
+        }
+
+    def what_if(self, trades):
+        """
+        Risk deltas from applying trades to the current portfolio.
+
+        ``trades`` is a {symbol: weight change} dict, a length-N vector, or an
+        M x N matrix of candidate trade lists evaluated in one batch. Returns
+        post-trade risk, changes versus the current portfolio and post-trade
+        factor exposures (arrays over candidates for batched input).
+        """
+        if isinstance(trades, dict):
+            idx = np.array([self._symbol_idx[s] for s in trades], dtype=int)
+            delta = np.fromiter(trades.values(), dtype=np.float64, count=len(idx))
+
+            # Sparse update touches only the traded rows
+            factor_exposure = self._factor_exposure + self.exposures[idx].T @ delta
+            old = self.weights[idx]
+            specific_var = self._specific_var + self.specific_var[idx] @ ((old + delta) ** 2 - old ** 2)
+        else:
+            delta = np.asarray(trades, dtype=np.float64)
+            factor_exposure = self._factor_exposure + delta @ self.exposures
+            specific_var = self._specific_var + ((self.weights + delta) ** 2 - self.weights ** 2) @ self.specific_var
+
+        factor_var = np.einsum("...k,kl,...l->...", factor_exposure, self.factor_cov, factor_exposure)
+        total_risk = np.sqrt(factor_var + specific_var)
+
+        current = self._risk
+
+        return {
+            'factor_exposures': factor_exposure,
+            'factor_risk': np.sqrt(factor_var),
+            'specific_risk': np.sqrt(specific_var),
+            'total_risk': total_risk,
+            'delta_total_risk': total_risk - current['total_risk'],
+            'delta_factor_exposures': factor_exposure - current['factor_exposures'],
+        }
+
+    def _as_vector(self, weights):
+        """
+        Dense weight vector from a {symbol: weight} dict or an array.
+        """
+        if isinstance(weights, dict):
+            vector = np.zeros(len(self.specific_var))
+            for symbol, weight in weights.items():
+                vector[self._symbol_idx[symbol]] = weight
+            return vector
+
+        return np.asarray(weights, dtype=np.float64)
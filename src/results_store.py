@@ -0,0 +1,199 @@
+import os
+import uuid
+import tempfile
+import polars as pl
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+
+
+SUMMARY_METRICS = [
+    'final_value', 'return_pct', 'annualized_return', 'annualized_volatility',
+    'sharpe_ratio', 'max_drawdown', 'avg_turnover',
+]
+
+
+def _atomic_write(df, path, fmt):
+    """
+    Write a frame to a temp file next to ``path`` and move it into place.
+    """
+    path.parent.mkdir(exist_ok=True, parents=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    os.close(fd)
+    try:
+        if fmt == "parquet":
+            df.write_parquet(tmp_path)
+        else:
+            # Uncompressed IPC so scans can memory-map the file
+            df.write_ipc(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ResultsStore:
+    """
+    On-disk store of backtest runs for fast cross-run queries.
+
+    Layout under ``root``::
+
+        index/run_id=<id>.parquet         one row per run: params + summary metrics
+        <table>/run_id=<id>/data.arrow    per-run series (Arrow IPC)
+
+    Tables are ``returns``, ``positions``, ``turnover``, ``optimizer`` and
+    ``attribution``. Series are scanned lazily and memory-mapped, so queries
+    over the index never touch full histories. Every file belongs to exactly
+    one run, so concurrent writers never contend for the same path.
+    """
+
+    TABLES = ('returns', 'positions', 'turnover', 'optimizer', 'attribution')
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(exist_ok=True, parents=True)
+        self.index_dir = self.root / "index"
+
+    def write_run(self, backtest_results, params=None, attribution_results=None, run_id=None):
+        """
+        Persist one backtest run and add it to the run index.
+        """
+        run_id = run_id or f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+        tables = {
+            'returns': self._returns_table(backtest_results),
+            'positions': self._positions_table(backtest_results),
+            'turnover': pl.DataFrame(
+                backtest_results.get('turnover_history', []),
+                schema={'date': pl.Date, 'turnover': pl.Float64, 'cost': pl.Float64}
+            ),
+            'optimizer': self._optimizer_table(backtest_results),
+        }
+        if attribution_results is not None:
+            tables['attribution'] = pl.DataFrame({
+                'source': list(attribution_results['factor_pcts']) + ['specific'],
+                'pct': [float(v) for v in attribution_results['factor_pcts'].values()]
+                       + [float(attribution_results['specific_pct'])],
+            })
+
+        for table, df in tables.items():
+            df = df.with_columns(pl.lit(run_id).alias("run_id"))
+            _atomic_write(df, self.root / table / f"run_id={run_id}" / "data.arrow", "ipc")
+
+        # Index goes last so a run is only visible once all its tables exist
+        dates = backtest_results.get('dates') or [None]
+        entry = {
+            'run_id': run_id,
+            'created_at': datetime.now(),
+            'start_date': dates[0],
+            'end_date': dates[-1],
+            **{k: float(backtest_results[k]) for k in SUMMARY_METRICS if k in backtest_results},
+        }
+        # Params never overwrite the index's own columns
+        for key, value in (params or {}).items():
+            if np.isscalar(value) or value is None:
+                entry[f"param_{key}" if key in entry else key] = value
+        entry = pl.DataFrame([entry])
+
+        _atomic_write(entry, self.index_dir / f"run_id={run_id}.parquet", "parquet")
+
+        return run_id
+
+    def runs(self):
+        """
+        Lazy frame over the run index, e.g.
+        ``store.runs().filter(pl.col("max_position") == 0.1).sort("sharpe_ratio", descending=True).head(10)``.
+        """
+        paths = sorted(self.index_dir.glob("run_id=*.parquet"))
+        if not paths:
+            return pl.LazyFrame(schema={'run_id': pl.Utf8})
+        # Runs may record different params, so align fragments by column name
+        return pl.concat([pl.scan_parquet(p) for p in paths], how="diagonal_relaxed")
+
+    def scan(self, table, run_ids=None):
+        """
+        Lazy, memory-mapped scan of a series table across runs.
+        """
+        if table not in self.TABLES:
+            raise ValueError(f"Unknown table {table!r}, expected one of {self.TABLES}")
+
+        if run_ids is None:
+            paths = sorted(str(p) for p in (self.root / table).glob("run_id=*/data.arrow"))
+        else:
+            paths = [str(self.root / table / f"run_id={r}" / "data.arrow") for r in run_ids]
+            paths = [p for p in paths if os.path.exists(p)]
+
+        if not paths:
+            raise FileNotFoundError(f"No stored {table} data under {self.root}")
+
+        return pl.scan_ipc(paths, hive_partitioning=False)
+
+    def load(self, table, run_id):
+        """
+        Load one run's table.
+        """
+        return self.scan(table, [run_id]).collect()
+
+    @staticmethod
+    def _returns_table(backtest_results):
+        """
+        Daily returns, cumulative returns and drawdowns.
+        """
+        if 'returns' not in backtest_results:
+            return pl.DataFrame(schema={'date': pl.Date, 'return': pl.Float64})
+
+        return pl.DataFrame({
+            'date': backtest_results['dates'][1:],
+            'return': backtest_results['returns'],
+            'cumulative_return': backtest_results['cumulative_returns'],
+            'drawdown': backtest_results['drawdowns'],
+        })
+
+    @staticmethod
+    def _positions_table(backtest_results):
+        """
+        Long (date, symbol, position) table from the portfolio history.
+        """
+        rows = [
+            {
+                'date': state['date'],
+                'symbol': ticker,
+                'position': float(position),
+                'portfolio_value': float(state['portfolio_value']),
+                'is_rebalance': state['is_rebalance'],
+            }
+            for state in backtest_results['portfolio_history']
+            for ticker, position in state['positions'].items()
+        ]
+        return pl.DataFrame(rows, schema={
+            'date': pl.Date, 'symbol': pl.Utf8, 'position': pl.Float64,
+            'portfolio_value': pl.Float64, 'is_rebalance': pl.Boolean,
+        })
+
+    @staticmethod
+    def _optimizer_table(backtest_results):
+        """
+        Scalar optimizer statistics and factor exposures at each rebalance.
+        """
+        rows = []
+        for state in backtest_results['portfolio_history']:
+            stats = state.get('portfolio_stats')
+            if not stats:
+                continue
+
+            row = {'date': state['date']}
+            for key, value in stats.items():
+                if np.isscalar(value):
+                    row[key] = float(value)
+                elif isinstance(value, dict):
+                    for k, v in value.items():
+                        row[f"{key}_{k}"] = float(v)
+                else:
+                    for k, v in enumerate(np.ravel(value)):
+                        row[f"{key}_{k}"] = float(v)
+            rows.append(row)
+
+        if not rows:
+            return pl.DataFrame(schema={'date': pl.Date})
+        return pl.DataFrame(rows)
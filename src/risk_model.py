@@ -2,33 +2,246 @@ import polars as pl
 import numpy as np
 
 
-def build_risk_model(stock_returns, factor_returns, mcaps):
+def build_risk_model(stock_returns, factor_returns, mcaps, mask=None):
+    """
+    Time-series factor model: per-stock betas against the factor returns.
 
-    stock_returns_np = stock_returns.to_numpy()
+    ``mask`` is an optional stocks x dates boolean array (e.g. the transposed
+    ``UniverseIndex.bitmap``); observations outside it are excluded from each
+    stock's regression and its specific variance instead of assuming a
+    rectangular panel.
+
+    ``stock_returns`` (stocks x dates) may be a frame or an array.
+    """
+    if hasattr(stock_returns, "to_numpy"):
+        stock_returns = stock_returns.to_numpy()
+    stock_returns_np = np.asarray(stock_returns, dtype=np.float64)
     factor_returns_np = factor_returns.to_numpy()
 
     n_stocks = stock_returns_np.shape[0]
     n_factors = factor_returns_np.shape[1]
 
+    if mask is None:
+        mask = np.ones(stock_returns_np.shape, dtype=bool)
+    mask = np.asarray(mask, dtype=bool) & np.isfinite(stock_returns_np)
+
     exposures = np.zeros((n_stocks, n_factors))
-    specific_returns = np.zeros_like(stock_returns_np)
+    specific_returns = np.full(stock_returns_np.shape, np.nan)
 
     weights = np.sqrt(mcaps.to_numpy().reshape(-1, 1))
 
     # For each stock, estimate factor exposures
     for i in range(n_stocks):
 
-        W = np.diag(weights[i, :])
+        valid = mask[i]
+        w = np.broadcast_to(weights[i, :], valid.shape)[valid]
 
-        X = factor_returns_np
-        y = stock_returns_np[i, :]
+        X = factor_returns_np[valid]
+        y = stock_returns_np[i, valid]
 
-        exposures[i, :] = np.linalg.lstsq(X.T @ W @ X, X.T @ W @ y, rcond=None)[0]
+        # Weighted normal equations without forming diag(w)
+        exposures[i, :] = np.linalg.lstsq(X.T @ (w[:, None] * X), X.T @ (w * y), rcond=None)[0]
 
-        specific_returns[i, :] = y - X @ exposures[i, :]
+        specific_returns[i, valid] = y - X @ exposures[i, :]
 
     factor_cov = np.cov(factor_returns_np.T)
 
-    specific_var = np.var(specific_returns, axis=1)
+    specific_var = np.nanvar(specific_returns, axis=1)
+
+    return exposures, factor_cov, specific_var
+
+
+GICS_SECTORS = {
+    10: 'Energy',
+    15: 'Materials',
+    20: 'Industrial',
+    25: 'Consumer',
+    30: 'Consumer',
+    35: 'Healthcare',
+    40: 'Financial',
+    45: 'Technology',
+    50: 'Communication',
+    55: 'Utilities',
+    60: 'RealEstate',
+}
+
+STYLE_FACTORS = {
+    'mom_score': 'momentum',
+    'size_score': 'size',
+    'value_score': 'value',
+    'quality_score': 'quality',
+}
+
+
+def _solve_xsection(returns, styles, sectors, weights):
+    """
+    Constrained cap-weighted least squares for a block of dates at once.
+
+    Solves every date's regression of returns on [market, styles, sectors]
+    with the cap-weighted sector returns constrained to sum to zero, which
+    keeps the market and sector factors identifiable. Names with zero weight
+    are masked out.
+    """
+    n_dates, n_stocks = returns.shape
+    n_styles = styles.shape[-1]
+    n_sectors = sectors.shape[-1]
+    n_factors = 1 + n_styles + n_sectors
+
+    X = np.concatenate([np.ones((n_dates, n_stocks, 1)), styles, sectors], axis=-1)
+    Xw = X * weights[..., None]
+
+    A = np.swapaxes(Xw, 1, 2) @ X
+    b = np.einsum("tnk,tn->tk", Xw, returns)
+
+    # Sectors with no members on a date get a zero return
+    diag = np.arange(n_factors)
+    empty = A[:, diag, diag] == 0
+    A[:, diag, diag] = np.where(empty, 1.0, A[:, diag, diag])
+
+    sector_caps = np.einsum("tng,tn->tg", sectors, weights ** 2)
+    total_caps = sector_caps.sum(axis=1, keepdims=True)
+    constraint = np.zeros((n_dates, n_factors))
+    constraint[:, 1 + n_styles:] = np.divide(
+        sector_caps, total_caps, out=np.zeros_like(sector_caps), where=total_caps > 0
+    )
+
+    kkt = np.zeros((n_dates, n_factors + 1, n_factors + 1))
+    kkt[:, :n_factors, :n_factors] = A
+    kkt[:, :n_factors, -1] = constraint
+    kkt[:, -1, :n_factors] = constraint
+    rhs = np.concatenate([b, np.zeros((n_dates, 1))], axis=1)
+
+    # Dates without enough names to identify every factor are left as NaN
+    n_obs = np.count_nonzero(weights, axis=1)
+    solvable = n_obs > n_factors - empty.sum(axis=1)
+    kkt[~solvable] = np.eye(n_factors + 1)
+
+    try:
+        solution = np.linalg.solve(kkt, rhs[..., None])[..., 0]
+    except np.linalg.LinAlgError:
+        # Degenerate exposures somewhere in the block (e.g. a constant style)
+        solution = (np.linalg.pinv(kkt) @ rhs[..., None])[..., 0]
+    factor_returns = solution[:, :n_factors]
+    factor_returns[~solvable] = np.nan
+
+    residuals = returns - np.einsum("tnk,tk->tn", X, factor_returns)
+    residuals[weights == 0] = np.nan
+
+    return factor_returns, residuals
+
+
+def build_fundamental_risk_model(
+        returns_data,
+        factor_scores,
+        score_cols=("mom_score", "size_score", "value_score", "quality_score"),
+        sector_col="gsector",
+        chunk_size=250
+):
+    """
+    Estimate a fundamental risk model from cross-sectional regressions.
+
+    Each date's returns are regressed on the previous date's style scores
+    and sector dummies, weighted by square-root market cap. Dates are
+    pivoted and solved as batched, masked least-squares problems in chunks
+    of ``chunk_size`` dates, so only one chunk is ever held densely.
+    Sectors with no members over the whole sample are dropped.
+
+    Returns daily factor returns, long-format residuals and the factor
+    covariance matrix.
+    """
+    panel_data = returns_data.join(
+        factor_scores.select("date", "symbol", *score_cols), on=["date", "symbol"], how="left"
+    ).select("date", "symbol", "asset_returns", "market_cap", sector_col, *score_cols)
+
+    dates = panel_data.select("date").unique().sort("date")["date"].to_list()
+    symbols = panel_data.select("symbol").unique().sort("symbol")["symbol"].to_list()
+
+    # Index every cell in the sorted dates/symbols order (the Enum's physical
+    # codes are the symbol positions); sorting by date once makes each chunk
+    # a row slice
+    value_cols = ["asset_returns", "market_cap", sector_col, *score_cols]
+    cells = (
+        panel_data
+        .select(
+            (pl.col("date").rank("dense") - 1).alias("_row"),
+            pl.col("symbol").cast(pl.Utf8).cast(pl.Enum(symbols)).to_physical().alias("_col"),
+            pl.col(value_cols).cast(pl.Float64)
+        )
+        .sort("_row")
+    )
+    date_starts = np.searchsorted(cells["_row"].to_numpy(), np.arange(len(dates) + 1))
+
+    sector_names = sorted(set(GICS_SECTORS.values()))
+    code_to_sector = np.full(100, -1)
+    for code, name in GICS_SECTORS.items():
+        code_to_sector[code] = sector_names.index(name)
+    sector_range = np.arange(len(sector_names))
+
+    style_names = [STYLE_FACTORS.get(col, col) for col in score_cols]
+    n_styles = len(score_cols)
+
+    factor_returns = np.empty((len(dates), 1 + n_styles + len(sector_names)))
+    sector_populated = np.zeros(len(sector_names), dtype=bool)
+    residual_chunks = []
+
+    for start in range(0, len(dates), chunk_size):
+        end = min(start + chunk_size, len(dates))
+
+        # One extra leading date supplies the previous close's exposures
+        lead = max(start - 1, 0)
+        chunk_dates = dates[lead:end]
+        chunk = cells.slice(date_starts[lead], date_starts[end] - date_starts[lead])
+        panel = np.full((end - lead, len(symbols), len(value_cols)), np.nan)
+        panel[chunk["_row"].to_numpy() - lead, chunk["_col"].to_numpy()] = (
+            chunk.select(pl.col(value_cols).fill_null(np.nan)).to_numpy()
+        )
+
+        # Exposures and weights are known at the previous close
+        returns = panel[start - lead:, :, 0]
+        prev = panel[:end - start] if start > 0 else np.concatenate(
+            [np.full_like(panel[:1], np.nan), panel[:end - start - 1]]
+        )
+        mcaps, sector_codes, styles = prev[..., 1], prev[..., 2], prev[..., 3:]
+
+        sector_idx = np.where(
+            np.isfinite(sector_codes),
+            code_to_sector[np.clip(np.nan_to_num(sector_codes), 0, 99).astype(int)],
+            -1
+        )
+
+        valid = (
+            np.isfinite(returns)
+            & np.isfinite(mcaps) & (mcaps > 0)
+            & np.all(np.isfinite(styles), axis=-1)
+            & (sector_idx >= 0)
+        )
+        weights = np.where(valid, np.sqrt(np.where(valid, mcaps, 0.0)), 0.0)
+        returns = np.where(valid, returns, 0.0)
+        styles = np.where(valid[..., None], styles, 0.0)
+        sectors = (np.where(valid, sector_idx, -1)[..., None] == sector_range).astype(np.float64)
+        sector_populated |= sectors.any(axis=(0, 1))
+
+        factor_returns[start:end], residuals = _solve_xsection(returns, styles, sectors, weights)
+
+        row, col = np.nonzero(np.isfinite(residuals))
+        residual_chunks.append(pl.DataFrame({
+            'date': pl.Series(chunk_dates[start - lead:])[row],
+            'symbol': pl.Series(symbols)[col],
+            'residual': residuals[row, col],
+        }))
+
+    keep = np.concatenate([np.ones(1 + n_styles, dtype=bool), sector_populated])
+    factor_names = [
+        name for name, k in zip(['market'] + style_names + sector_names, keep) if k
+    ]
+    factor_returns = factor_returns[:, keep]
+
+    factor_returns_df = pl.DataFrame(
+        {'date': dates, **{name: factor_returns[:, k] for k, name in enumerate(factor_names)}}
+    )
+    residuals_df = pl.concat(residual_chunks)
+
+    solved = np.all(np.isfinite(factor_returns), axis=1)
+    factor_cov = np.cov(factor_returns[solved].T)
 
-    return exposures, factor_cov, specific_var
\ No newline at end of file
+    return factor_returns_df, residuals_df, factor_cov
@@ -0,0 +1,139 @@
+import polars as pl
+import numpy as np
+from statistics import NormalDist
+
+from src.backtest import history_weights
+
+
+FF_FACTORS = ('mktrf', 'smb', 'hml', 'rmw', 'cma', 'umd')
+
+
+def historical_scenarios(factors_data, factor_names=FF_FACTORS, horizon=1):
+    """
+    Factor shock scenarios from every historical ``horizon``-day window.
+    """
+    factor_returns = factors_data.sort("date").select("date", *factor_names)
+    shocks = factor_returns.select(factor_names).to_numpy()
+
+    cum = np.vstack([np.zeros((1, shocks.shape[1])), np.cumsum(shocks, axis=0)])
+    window_shocks = cum[horizon:] - cum[:-horizon]
+
+    start_dates = factor_returns["date"][:len(window_shocks)]
+
+    return pl.DataFrame({
+        'scenario': [f"hist_{d}" for d in start_dates.to_list()],
+        **{name: window_shocks[:, k] for k, name in enumerate(factor_names)}
+    })
+
+
+def hypothetical_scenarios(factor_cov, factor_names=FF_FACTORS, n_scenarios=1000, n_sigma=3.0,
+                           horizon=1, seed=None):
+    """
+    Hypothetical factor shocks on the ``n_sigma`` ellipsoid of the factor covariance.
+
+    Includes a +/- ``n_sigma`` shock to each single factor followed by
+    ``n_scenarios`` random joint directions.
+    """
+    rng = np.random.default_rng(seed)
+    factor_cov = np.asarray(factor_cov) * horizon
+    n_factors = len(factor_names)
+
+    vols = np.sqrt(np.diag(factor_cov))
+    single = np.vstack([np.diag(vols), -np.diag(vols)]) * n_sigma
+    single_names = [f"{sign}{n_sigma:g}sd_{name}" for sign in ("+", "-") for name in factor_names]
+
+    directions = rng.standard_normal((n_scenarios, n_factors))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    chol = np.linalg.cholesky(factor_cov + np.eye(n_factors) * 1e-12)
+    joint = directions @ chol.T * n_sigma
+
+    return pl.DataFrame({
+        'scenario': single_names + [f"joint_{i}" for i in range(n_scenarios)],
+        **{name: np.concatenate([single[:, k], joint[:, k]]) for k, name in enumerate(factor_names)}
+    })
+
+
+def rebalance_weights(backtest_results, symbols):
+    """
+    Dates and weights of every rebalance in a backtest's portfolio history.
+    """
+    history = [s for s in backtest_results['portfolio_history'] if s['is_rebalance']]
+    return [s['date'] for s in history], history_weights(history, symbols)
+
+
+def stress_test(
+        weights,
+        exposures,
+        specific_risk,
+        scenarios,
+        dates=None,
+        factor_names=FF_FACTORS,
+        gmv=1.0,
+        tail_prob=0.01,
+        horizon=1,
+        chunk_size=2000
+):
+    """
+    Apply factor shock scenarios to every portfolio in a history at once.
+
+    ``weights`` is dates x symbols and ``exposures`` either symbols x factors
+    or dates x symbols x factors. Factor P&L for every (scenario, date) pair
+    comes from one scenarios x dates x factors contraction; the specific-risk
+    tail adds the ``tail_prob`` normal quantile of each portfolio's
+    idiosyncratic P&L over ``horizon`` days.
+
+    Returns the full scenarios x dates P&L matrix plus worst-case tables by
+    date and by scenario.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    exposures = np.asarray(exposures, dtype=np.float64)
+
+    if isinstance(scenarios, pl.DataFrame):
+        scenario_names = scenarios["scenario"].to_list() if "scenario" in scenarios.columns else None
+        shocks = scenarios.select(factor_names).to_numpy()
+    else:
+        scenario_names = None
+        shocks = np.asarray(scenarios, dtype=np.float64)
+    if scenario_names is None:
+        scenario_names = [f"scenario_{i}" for i in range(len(shocks))]
+    if dates is None:
+        dates = list(range(len(weights)))
+
+    if exposures.ndim == 2:
+        portfolio_exposures = weights @ exposures
+    else:
+        portfolio_exposures = np.einsum("dn,dnk->dk", weights, exposures)
+
+    specific_vol = np.sqrt(weights ** 2 @ np.asarray(specific_risk, dtype=np.float64) * horizon)
+    specific_tail = NormalDist().inv_cdf(tail_prob) * specific_vol * gmv
+
+    factor_pnl = np.empty((len(shocks), len(weights)))
+    for start in range(0, len(shocks), chunk_size):
+        block = slice(start, start + chunk_size)
+        factor_pnl[block] = np.einsum("sk,dk->sd", shocks[block], portfolio_exposures) * gmv
+
+    pnl = factor_pnl + specific_tail
+
+    worst_scenario = np.argmin(pnl, axis=0)
+    date_idx = np.arange(len(dates))
+    by_date = pl.DataFrame({
+        'date': dates,
+        'worst_scenario': [scenario_names[i] for i in worst_scenario],
+        'worst_pnl': pnl[worst_scenario, date_idx],
+        'factor_pnl': factor_pnl[worst_scenario, date_idx],
+        'specific_tail': specific_tail,
+    })
+
+    worst_date = np.argmin(pnl, axis=1)
+    by_scenario = pl.DataFrame({
+        'scenario': scenario_names,
+        'worst_date': [dates[i] for i in worst_date],
+        'worst_pnl': pnl[np.arange(len(shocks)), worst_date],
+        'mean_pnl': pnl.mean(axis=1),
+    }).sort("worst_pnl")
+
+    return {
+        'pnl': pnl,
+        'by_date': by_date,
+        'by_scenario': by_scenario,
+    }
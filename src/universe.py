@@ -0,0 +1,112 @@
+import polars as pl
+import numpy as np
+
+from src.data import pivot_panel
+
+
+class UniverseIndex:
+    """
+    Precomputed dates x symbols membership bitmap.
+
+    A cell is set when the symbol has a valid observation on that date.
+    Per-symbol first/last valid rows give listing and delisting, and every
+    mask lookup is a row view, so "tradable as of D" costs O(1) instead of a
+    filter over the stock panel.
+    """
+
+    def __init__(self, dates, symbols, bitmap):
+        self.dates = list(dates)
+        self.symbols = list(symbols)
+        self.bitmap = np.asarray(bitmap, dtype=bool)
+
+        n_dates = len(self.dates)
+        rows = np.arange(n_dates)[:, None]
+        has_data = self.bitmap.any(axis=0)
+
+        self.first_idx = np.where(has_data, self.bitmap.argmax(axis=0), n_dates)
+        self.last_idx = np.where(has_data, n_dates - 1 - self.bitmap[::-1].argmax(axis=0), -1)
+
+        self.listed_bitmap = (rows >= self.first_idx) & (rows <= self.last_idx)
+        self.delisted_bitmap = rows > self.last_idx
+
+        self._date_row = {d: i for i, d in enumerate(self.dates)}
+        self.symbol_idx = {s: j for j, s in enumerate(self.symbols)}
+
+    @classmethod
+    def from_stock_data(cls, stock_data, value_col="prccd"):
+        """
+        Build the index from a long stock panel; rows with a missing or
+        non-finite ``value_col`` count as gaps.
+        """
+        if value_col not in stock_data.columns:
+            stock_data = stock_data.with_columns(pl.lit(1.0).alias(value_col))
+
+        dates, symbols, values = pivot_panel(stock_data, value_col)
+        return cls(dates, symbols, np.isfinite(values))
+
+    def row(self, date):
+        """
+        Row of ``date``, or of the last indexed date before it.
+        """
+        row = self._date_row.get(date)
+        if row is None:
+            row = int(np.searchsorted(np.array(self.dates), date, side="right")) - 1
+            if row < 0:
+                raise KeyError(f"{date} is before the first indexed date")
+        return row
+
+    def tradable(self, date):
+        """
+        Symbols with a valid observation on ``date``.
+        """
+        return self.bitmap[self.row(date)]
+
+    def listed(self, date):
+        """
+        Symbols between their first and last valid dates (gaps included).
+        """
+        return self.listed_bitmap[self.row(date)]
+
+    def delisted(self, date):
+        """
+        Symbols with no valid observation on or after ``date``.
+        """
+        return self.delisted_bitmap[self.row(date)]
+
+    def tradable_symbols(self, date):
+        """
+        List of symbols tradable on ``date``.
+        """
+        return [s for s, ok in zip(self.symbols, self.tradable(date)) if ok]
+
+    def lifetimes(self):
+        """
+        First and last valid date for each symbol.
+        """
+        has_data = self.last_idx >= 0
+        return pl.DataFrame({
+            'symbol': self.symbols,
+            'first_date': [self.dates[i] if ok else None for i, ok in zip(self.first_idx, has_data)],
+            'last_date': [self.dates[i] if ok else None for i, ok in zip(self.last_idx, has_data)],
+            'n_valid': self.bitmap.sum(axis=0),
+        })
+
+    def gaps(self):
+        """
+        Runs of missing observations between each symbol's first and last
+        valid dates.
+        """
+        missing = self.listed_bitmap & ~self.bitmap
+        edge = np.zeros((1, len(self.symbols)), dtype=bool)
+        changes = np.diff(np.vstack([edge, missing, edge]).astype(np.int8), axis=0).T
+
+        # Starts and ends come out ordered by symbol then date, so they pair up
+        gap_symbols, gap_starts = np.nonzero(changes == 1)
+        _, gap_ends = np.nonzero(changes == -1)
+
+        return pl.DataFrame({
+            'symbol': [self.symbols[j] for j in gap_symbols],
+            'gap_start': [self.dates[i] for i in gap_starts],
+            'gap_end': [self.dates[i - 1] for i in gap_ends],
+            'length': gap_ends - gap_starts,
+        })
@@ -0,0 +1,257 @@
+import os
+import itertools
+import multiprocessing
+from multiprocessing import shared_memory
+import polars as pl
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from src.backtest import _backtest_dates, blend_panels, simulate_blends, performance_metrics
+
+
+# Read-only panels shared with pool workers; set once per process by
+# _init_worker rather than pickled with every task
+_PANELS = {}
+
+
+def _init_worker(returns_panel, scores):
+    """
+    Install the shared panels in the current process.
+    """
+    _PANELS['returns'] = returns_panel
+    _PANELS['scores'] = scores
+
+
+def _share_array(array):
+    """
+    Copy ``array`` into a new shared memory block.
+
+    Returns the block, which the caller must close and unlink, and the
+    (name, shape, dtype) spec workers attach with.
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+def _attach_worker(returns_spec, scores_spec):
+    """
+    Map the parent's shared panels into a pool worker without copying.
+    """
+    panels = []
+    for name, shape, dtype in (returns_spec, scores_spec):
+        block = shared_memory.SharedMemory(name=name)
+        panel = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        panel.flags.writeable = False
+        panels.append(panel)
+        # Keep the mapping alive for the worker's lifetime
+        _PANELS.setdefault('blocks', []).append(block)
+
+    _init_worker(*panels)
+
+
+def simplex_grid(n_factors, resolution=4):
+    """
+    Every long-only blend whose weights are multiples of 1 / ``resolution``.
+    """
+    grid = [
+        combo for combo in itertools.product(range(resolution + 1), repeat=n_factors)
+        if sum(combo) == resolution
+    ]
+    return np.array(grid, dtype=np.float64) / resolution
+
+
+def walk_forward_folds(n_dates, train_days=756, test_days=252):
+    """
+    Rolling (train_start, train_end, test_start, test_end) index ranges.
+
+    Ends are exclusive and consecutive test windows are contiguous.
+    """
+    folds = []
+    start = 0
+    while start + train_days < n_dates:
+        test_start = start + train_days
+        folds.append((start, test_start, test_start, min(test_start + test_days, n_dates)))
+        start += test_days
+
+    return folds
+
+
+def _sharpe(strategy_returns, n_days):
+    """
+    Sharpe ratio of each strategy column over ``n_days`` trading days.
+    """
+    return performance_metrics(strategy_returns, n_days / 252)['sharpe_ratio']
+
+
+def _train_candidates(fold, settings, blend_weights, sim_kwargs, prune_keep):
+    """
+    Best blend for one (fold, settings) pair on the training window.
+
+    Candidates are first scored on the first half of the window and only the
+    top ``prune_keep`` fraction is re-run on the full window.
+    """
+    returns_panel, scores = _PANELS['returns'], _PANELS['scores']
+    train_start, train_end = fold[0], fold[1]
+
+    candidates = np.arange(len(blend_weights))
+    half = train_start + (train_end - train_start) // 2
+
+    if prune_keep < 1 and half - train_start > 1 and len(candidates) > 1:
+        strategy_returns, _, _ = simulate_blends(
+            returns_panel, scores, blend_weights, first=train_start, last=half - 1,
+            **settings, **sim_kwargs
+        )
+        sharpe = _sharpe(strategy_returns, half - train_start)
+        n_keep = max(1, int(np.ceil(len(candidates) * prune_keep)))
+        candidates = np.argsort(-sharpe)[:n_keep]
+
+    strategy_returns, _, _ = simulate_blends(
+        returns_panel, scores, blend_weights[candidates], first=train_start, last=train_end - 1,
+        **settings, **sim_kwargs
+    )
+    sharpe = _sharpe(strategy_returns, train_end - train_start)
+    best = int(np.argmax(sharpe))
+
+    return int(candidates[best]), float(sharpe[best])
+
+
+def _test_candidate(fold, settings, blend, sim_kwargs):
+    """
+    Out-of-sample returns of the chosen candidate over a test window.
+
+    Positions are formed on the last training date, so returns start on the
+    first test date.
+    """
+    returns_panel, scores = _PANELS['returns'], _PANELS['scores']
+    test_start, test_end = fold[2], fold[3]
+
+    strategy_returns, _, _ = simulate_blends(
+        returns_panel, scores, blend, first=test_start - 1, last=test_end - 1,
+        **settings, **sim_kwargs
+    )
+    return strategy_returns[:, 0]
+
+
+def walk_forward(
+        initial_capital,
+        stock_data,
+        factor_scores,
+        blend_weights=None,
+        settings_grid=None,
+        score_cols=("mom_score", "size_score", "value_score", "quality_score"),
+        train_days=756,
+        test_days=252,
+        rebalance_frequency=21,
+        transaction_cost=0.0005,
+        prune_keep=0.25,
+        n_jobs=None,
+        start_date=None,
+        end_date=None
+):
+    """
+    Walk-forward search over factor blends and sizing settings.
+
+    Each rolling fold picks the blend and ``settings_grid`` entry (dicts of
+    ``max_position``/``max_vol``) with the best training Sharpe, then
+    evaluates them on the following test window. Test windows are stitched
+    into one out-of-sample return series. Folds x settings run in a process
+    pool that maps the dense panels from shared memory instead of copying
+    them into every worker; blends within a task are simulated together and
+    pruned after half the training window.
+    """
+    if blend_weights is None:
+        blend_weights = simplex_grid(len(score_cols))
+    blend_weights = np.atleast_2d(np.asarray(blend_weights, dtype=np.float64))
+    if settings_grid is None:
+        settings_grid = [
+            {'max_position': max_position, 'max_vol': max_vol}
+            for max_position in (0.1, 0.15, 0.2)
+            for max_vol in (None, 0.15, 0.25)
+        ]
+
+    dates = _backtest_dates(stock_data, start_date, end_date)
+    _, returns_panel, scores = blend_panels(stock_data, factor_scores, score_cols, dates)
+
+    folds = walk_forward_folds(len(dates), train_days, test_days)
+    if not folds:
+        raise ValueError("Not enough dates for a single train/test fold")
+
+    sim_kwargs = {
+        'initial_capital': initial_capital,
+        'rebalance_frequency': rebalance_frequency,
+        'transaction_cost': transaction_cost,
+    }
+
+    tasks = list(itertools.product(range(len(folds)), range(len(settings_grid))))
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+
+    print(f"Walk-forward: {len(folds)} folds x {len(settings_grid)} settings x {len(blend_weights)} blends")
+
+    if n_jobs <= 1:
+        _init_worker(returns_panel, scores)
+        train_results = [
+            _train_candidates(folds[f], settings_grid[g], blend_weights, sim_kwargs, prune_keep)
+            for f, g in tasks
+        ]
+    else:
+        returns_block, returns_spec = _share_array(returns_panel)
+        scores_block, scores_spec = _share_array(scores)
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=n_jobs,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_attach_worker,
+                    initargs=(returns_spec, scores_spec)
+            ) as executor:
+                train_results = list(executor.map(
+                    _train_candidates,
+                    [folds[f] for f, _ in tasks],
+                    [settings_grid[g] for _, g in tasks],
+                    itertools.repeat(blend_weights),
+                    itertools.repeat(sim_kwargs),
+                    itertools.repeat(prune_keep)
+                ))
+        finally:
+            for block in (returns_block, scores_block):
+                block.close()
+                block.unlink()
+
+    # Best settings per fold
+    chosen = {}
+    for (f, g), (blend_idx, sharpe) in zip(tasks, train_results):
+        if f not in chosen or sharpe > chosen[f][2]:
+            chosen[f] = (g, blend_idx, sharpe)
+
+    _init_worker(returns_panel, scores)
+    fold_rows = []
+    oos_returns = []
+    for f, fold in enumerate(folds):
+        g, blend_idx, train_sharpe = chosen[f]
+        test_returns = _test_candidate(fold, settings_grid[g], blend_weights[blend_idx], sim_kwargs)
+        oos_returns.append(test_returns)
+
+        fold_rows.append({
+            'fold': f,
+            'train_start': dates[fold[0]],
+            'train_end': dates[fold[1] - 1],
+            'test_start': dates[fold[2]],
+            'test_end': dates[fold[3] - 1],
+            **{col: float(blend_weights[blend_idx, j]) for j, col in enumerate(score_cols)},
+            'max_position': settings_grid[g].get('max_position'),
+            'max_vol': settings_grid[g].get('max_vol'),
+            'train_sharpe': train_sharpe,
+            'test_sharpe': float(_sharpe(test_returns[:, None], len(test_returns))[0]),
+        })
+
+    returns = np.concatenate(oos_returns)
+    oos_dates = dates[folds[0][2]:folds[-1][3]]
+    years = (oos_dates[-1] - oos_dates[0]).days / 365.25
+
+    return {
+        'folds': pl.DataFrame(fold_rows),
+        'dates': oos_dates,
+        'returns': returns,
+        'cumulative_returns': np.cumprod(1 + returns) - 1,
+        'metrics': {k: float(v) for k, v in performance_metrics(returns, years).items()},
+    }
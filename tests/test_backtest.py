@@ -0,0 +1,225 @@
+import io
+import contextlib
+import datetime as dt
+
+import numpy as np
+import polars as pl
+
+import pytest
+
+from src.backtest import backtest_strategy, backtest_blends, blend_panels, simulate_blends
+from src.checkpoint import run_fingerprint
+from src.portfolio import alpha_weights, construct_portfolio
+
+SCORE_COLS = ("mom_score", "size_score", "value_score", "quality_score")
+
+
+def make_panel(n_dates=120, n_symbols=6, seed=0):
+    """
+    Deterministic long stock panel with returns, prices and factor scores.
+    """
+    rng = np.random.default_rng(seed)
+    dates = [dt.date(2020, 1, 1) + dt.timedelta(days=i) for i in range(n_dates)]
+    symbols = [f"S{j}" for j in range(n_symbols)]
+    n_rows = n_dates * n_symbols
+
+    return pl.DataFrame({
+        'date': np.repeat(np.array(dates), n_symbols).tolist(),
+        'symbol': symbols * n_dates,
+        'prccd': rng.uniform(10, 20, n_rows),
+        'asset_returns': rng.normal(0, 0.02, n_rows),
+        'market_cap': rng.uniform(1, 10, n_rows),
+        **{col: rng.normal(size=n_rows) for col in SCORE_COLS},
+    })
+
+
+def quiet(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+class BlendStrategy:
+    """
+    Sequential strategy equivalent to one row of ``simulate_blends``.
+    """
+
+    def __init__(self, panel, blend, max_position=0.15, gmv=1_000_000):
+        self.scores = panel.select("date", "symbol", *SCORE_COLS)
+        self.blend = np.asarray(blend, dtype=np.float64)
+        self.max_position = max_position
+        self.gmv = gmv
+
+    def __call__(self, current_stocks, current_factors, current_date):
+        latest = (
+            self.scores.filter(pl.col("date") <= current_date)
+            .sort("date").group_by("symbol").last().sort("symbol")
+        )
+        alphas = latest.select(SCORE_COLS).to_numpy() @ self.blend
+        weights = alpha_weights(alphas[:, None], self.max_position)[:, 0]
+        return dict(zip(latest["symbol"].to_list(), weights * self.gmv)), {}
+
+
+def test_simulate_blends_matches_backtest_strategy():
+    panel = make_panel()
+    blend = [0.3, 0.2, 0.3, 0.2]
+
+    sequential = quiet(backtest_strategy, 1_000_000, panel, panel, BlendStrategy(panel, blend), 21)
+
+    dates = panel.select("date").unique().sort("date")["date"].to_list()
+    _, returns_panel, scores = blend_panels(panel, panel, SCORE_COLS, dates)
+    returns, final_values, _ = simulate_blends(returns_panel, scores, [blend], 1_000_000)
+
+    np.testing.assert_allclose(returns[:, 0], sequential['returns'], atol=1e-14)
+    np.testing.assert_allclose(final_values[0], sequential['final_value'], rtol=1e-12)
+
+
+def test_backtest_blends_one_row_per_strategy():
+    panel = make_panel()
+    blends = np.eye(4)
+
+    result = quiet(backtest_blends, 1_000_000, panel, panel, blends)
+
+    assert result['metrics'].height == 4
+    assert result['returns'].shape == (len(result['dates']) - 1, 4)
+    for j in range(4):
+        single = quiet(backtest_blends, 1_000_000, panel, panel, blends[j:j + 1])
+        np.testing.assert_allclose(single['returns'][:, 0], result['returns'][:, j])
+
+
+def test_parallel_rebalance_matches_sequential():
+    panel = make_panel()
+    strategy = BlendStrategy(panel, [0.3, 0.2, 0.3, 0.2])
+
+    sequential = quiet(backtest_strategy, 1_000_000, panel, panel, strategy, 21)
+    parallel = quiet(backtest_strategy, 1_000_000, panel, panel, strategy, 21,
+                     parallel_rebalance=True, n_jobs=2)
+
+    np.testing.assert_array_equal(parallel['returns'], sequential['returns'])
+    assert parallel['final_value'] == sequential['final_value']
+    assert parallel['turnover_history'] == sequential['turnover_history']
+
+
+class Interrupted(BaseException):
+    """
+    Stands in for a kill; not caught by the backtest's rebalance handler.
+    """
+
+
+def optimizer_strategy(panel, fail_on=None):
+    """
+    Strategy solving ``construct_portfolio`` on blended scores; raises
+    ``Interrupted`` when asked for ``fail_on``.
+    """
+    scores = panel.select("date", "symbol", *SCORE_COLS)
+    symbols = sorted(panel["symbol"].unique().to_list())
+    rng = np.random.default_rng(1)
+    exposures = rng.normal(size=(len(symbols), 2))
+    factor_cov = np.diag([0.01, 0.02])
+    specific_risk = np.full(len(symbols), 0.04)
+
+    def strategy(current_stocks, current_factors, current_date):
+        if current_date == fail_on:
+            raise Interrupted()
+        latest = (
+            scores.filter(pl.col("date") <= current_date)
+            .sort("date").group_by("symbol").last().sort("symbol")
+        )
+        alphas = latest.select(SCORE_COLS).to_numpy().mean(axis=1)
+        positions, stats = construct_portfolio(
+            alphas, exposures, factor_cov, specific_risk, 1_000_000, 0.3,
+            max_vol=0.5, factor_constraints={'a': 1.0, 'b': 1.0}
+        )
+        return dict(zip(symbols, positions)), stats
+
+    return strategy
+
+
+def test_resumed_backtest_matches_uninterrupted(tmp_path):
+    panel = make_panel()
+    dates = sorted(panel["date"].unique().to_list())
+    fingerprint = run_fingerprint("optimizer", {'max_position': 0.3}, panel)
+    kwargs = {'checkpoint_every': 1, 'fingerprint': fingerprint}
+
+    full = quiet(backtest_strategy, 1_000_000, panel, panel, optimizer_strategy(panel), 21)
+
+    checkpoint = tmp_path / "run.ckpt"
+    with pytest.raises(Interrupted):
+        quiet(backtest_strategy, 1_000_000, panel, panel, optimizer_strategy(panel, fail_on=dates[63]), 21,
+              checkpoint_path=checkpoint, **kwargs)
+    resumed = quiet(backtest_strategy, 1_000_000, panel, panel, optimizer_strategy(panel), 21,
+                    checkpoint_path=checkpoint, resume=True, **kwargs)
+
+    np.testing.assert_allclose(resumed['returns'], full['returns'], rtol=1e-9, atol=1e-12)
+    assert resumed['final_value'] == pytest.approx(full['final_value'], rel=1e-9)
+    assert [s['date'] for s in resumed['portfolio_history']] == dates
+    assert [t['date'] for t in resumed['turnover_history']] == [t['date'] for t in full['turnover_history']]
+
+
+def test_resume_rejects_checkpoint_from_other_run(tmp_path):
+    panel = make_panel()
+    checkpoint = tmp_path / "run.ckpt"
+    quiet(backtest_strategy, 1_000_000, panel, panel, BlendStrategy(panel, [1, 0, 0, 0]), 21,
+          checkpoint_path=checkpoint, checkpoint_every=1, fingerprint="a")
+
+    with pytest.raises(ValueError, match="different backtest"):
+        quiet(backtest_strategy, 1_000_000, panel, panel, BlendStrategy(panel, [0, 1, 0, 0]), 21,
+              checkpoint_path=checkpoint, resume=True, fingerprint="b")
+
+
+class FixedStrategy:
+    """
+    Always targets the same dollar positions.
+    """
+
+    def __init__(self, positions):
+        self.positions = positions
+
+    def __call__(self, current_stocks, current_factors, current_date):
+        return dict(self.positions), {}
+
+
+def test_delisted_names_are_liquidated_and_gaps_earn_zero():
+    dates = [dt.date(2020, 1, 1) + dt.timedelta(days=i) for i in range(10)]
+    # B is missing on days 3-4 and delists after day 6
+    b_days = [0, 1, 2, 5, 6]
+    panel = pl.DataFrame({
+        'date': dates + [dates[i] for i in b_days],
+        'symbol': ["A"] * 10 + ["B"] * len(b_days),
+        'prccd': 10.0,
+        'asset_returns': [0.01] * 10 + [0.02] * len(b_days),
+    })
+    cost = 0.001
+
+    result = quiet(backtest_strategy, 1_000_000, panel, panel, FixedStrategy({"A": 500_000, "B": 500_000}),
+                   100, transaction_cost=cost)
+
+    pnl = [5_000 + (10_000 if i in b_days else 0) for i in range(1, 10)]
+    expected_final = 1_000_000 - 1_000_000 * cost + sum(pnl) - 500_000 * cost
+    assert result['final_value'] == pytest.approx(expected_final)
+
+    liquidation = result['turnover_history'][-1]
+    assert len(result['turnover_history']) == 2
+    assert liquidation['date'] == dates[7]
+    assert liquidation['cost'] == pytest.approx(500_000 * cost)
+
+    history = result['portfolio_history']
+    assert "B" in history[6]['positions']
+    assert "B" not in history[7]['positions']
+
+
+def test_returns_are_derived_from_prices_when_missing():
+    # Prices that compound to the panel's returns
+    panel = make_panel().with_columns(
+        (10 * (1 + pl.col("asset_returns")).cum_prod().over("symbol")).alias("prccd")
+    )
+    strategy = BlendStrategy(panel, [0.3, 0.2, 0.3, 0.2])
+
+    with_returns = quiet(backtest_strategy, 1_000_000, panel, panel, strategy, 21)
+    prices_only = quiet(backtest_strategy, 1_000_000, panel.drop("asset_returns"), panel, strategy, 21)
+
+    # The first date's return is never earned
+    np.testing.assert_allclose(prices_only['returns'], with_returns['returns'], rtol=1e-10)
+    assert prices_only['final_value'] == pytest.approx(with_returns['final_value'], rel=1e-10)
+
+    with pytest.raises(ValueError, match="price column"):
+        quiet(backtest_strategy, 1_000_000, panel.drop("asset_returns", "prccd"), panel, strategy, 21)
@@ -0,0 +1,50 @@
+import numpy as np
+
+from src.backtest import performance_metrics
+from src.bootstrap import stationary_bootstrap_indices, bootstrap_metrics, confidence_intervals
+
+
+def test_stationary_bootstrap_indices_shape_range_and_seed():
+    idx = stationary_bootstrap_indices(50, 200, mean_block=5, rng=0)
+
+    assert idx.shape == (200, 50)
+    assert idx.min() >= 0 and idx.max() < 50
+    np.testing.assert_array_equal(idx, stationary_bootstrap_indices(50, 200, mean_block=5, rng=0))
+
+
+def test_stationary_bootstrap_indices_blocks_are_consecutive_rows():
+    idx = stationary_bootstrap_indices(40, 500, mean_block=8, rng=1)
+
+    # Within a block each row follows the previous one, wrapping at the end
+    continues = (idx[:, 1:] - idx[:, :-1]) % 40 == 1
+    mean_block = idx.size / (idx.shape[0] + np.count_nonzero(~continues))
+    assert 6 < mean_block < 10
+
+    # An effectively infinite block length gives one wrapped block per path
+    long = stationary_bootstrap_indices(40, 10, mean_block=1e12, rng=2)
+    np.testing.assert_array_equal((long - long[:, :1]) % 40, np.tile(np.arange(40), (10, 1)))
+
+
+def test_panel_paths_match_direct_reweighting():
+    rng = np.random.default_rng(3)
+    returns = rng.normal(0, 0.01, (60, 5))
+    weights = rng.normal(size=(60, 5))
+
+    result = bootstrap_metrics(returns, 1.0, weights=weights, n_paths=30, chunk_size=30, seed=4, n_jobs=1)
+
+    # Same indices as the single chunk, applied to the full paths x dates x names array
+    idx = stationary_bootstrap_indices(60, 30, 21, np.random.SeedSequence(4).spawn(1)[0])
+    expected = performance_metrics(np.einsum("ptn,tn->tp", returns[idx], weights), 1.0)
+    for metric, values in expected.items():
+        np.testing.assert_allclose(result[metric], values)
+
+
+def test_strategy_returns_paths_and_intervals():
+    returns = np.random.default_rng(5).normal(0.001, 0.01, 120)
+
+    result = bootstrap_metrics(returns, 0.5, n_paths=50, chunk_size=20, seed=6)
+    assert all(len(values) == 50 for values in result.values())
+
+    intervals = confidence_intervals(result)
+    assert (intervals["lower"] <= intervals["median"]).all()
+    assert (intervals["median"] <= intervals["upper"]).all()
@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.math_utils import forward_fill
+
+
+def test_forward_fill_carries_last_finite_value():
+    data = np.array([
+        [np.nan, 1.0],
+        [2.0, np.nan],
+        [np.nan, np.inf],
+        [3.0, 4.0],
+    ])
+
+    filled = forward_fill(data)
+
+    expected = np.array([
+        [np.nan, 1.0],
+        [2.0, 1.0],
+        [2.0, 1.0],
+        [3.0, 4.0],
+    ])
+    np.testing.assert_array_equal(filled, expected)
+
+
+def test_forward_fill_handles_trailing_axes():
+    data = np.full((3, 2, 2), np.nan)
+    data[0, 0, 0] = 5.0
+    data[1, 1, 1] = 7.0
+
+    filled = forward_fill(data)
+
+    assert filled[2, 0, 0] == 5.0
+    assert filled[2, 1, 1] == 7.0
+    assert np.isnan(filled[0, 1, 1])
+    assert np.isnan(filled[2, 0, 1])
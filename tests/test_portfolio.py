@@ -0,0 +1,28 @@
+import numpy as np
+
+from src.portfolio import alpha_weights
+
+
+def test_alpha_weights_unit_gross_and_cap():
+    rng = np.random.default_rng(0)
+    alphas = rng.normal(size=(20, 5))
+
+    weights = alpha_weights(alphas, max_position=0.1)
+
+    np.testing.assert_allclose(np.abs(weights).sum(axis=0), 1.0)
+    assert np.abs(weights).max() <= 0.1 + 1e-12
+    # Signs follow the alphas
+    assert np.all(np.sign(weights[weights != 0]) == np.sign(alphas[weights != 0]))
+
+
+def test_alpha_weights_vector_and_degenerate_inputs():
+    weights = alpha_weights(np.array([[3.0], [1.0], [np.nan], [0.0]]), max_position=1.0)
+    np.testing.assert_allclose(weights[:, 0], [0.75, 0.25, 0.0, 0.0])
+
+    zeros = alpha_weights(np.zeros((4, 2)))
+    np.testing.assert_array_equal(zeros, 0.0)
+
+
+def test_alpha_weights_cap_below_equal_weight_leaves_gross_under_one():
+    weights = alpha_weights(np.ones((4, 1)), max_position=0.1)
+    np.testing.assert_allclose(weights[:, 0], 0.1)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from src.pretrade import PreTradeRisk
+
+
+def make_model(n_stocks=8, n_factors=3, seed=0):
+    """
+    Random factor model and its dense N x N covariance.
+    """
+    rng = np.random.default_rng(seed)
+    exposures = rng.normal(size=(n_stocks, n_factors))
+    loadings = rng.normal(size=(n_factors, n_factors))
+    factor_cov = loadings @ loadings.T / 100
+    specific_risk = rng.uniform(0.01, 0.05, n_stocks)
+    symbols = [f"S{i}" for i in range(n_stocks)]
+
+    model = PreTradeRisk(exposures, factor_cov, specific_risk, symbols=symbols)
+    dense = exposures @ factor_cov @ exposures.T + np.diag(specific_risk)
+    return model, dense, rng
+
+
+def test_portfolio_risk_matches_dense_covariance():
+    model, dense, rng = make_model()
+    weights = rng.normal(size=8)
+
+    risk = model.portfolio_risk(weights)
+
+    assert risk['total_risk'] == pytest.approx(np.sqrt(weights @ dense @ weights))
+    assert risk['factor_risk'] ** 2 + risk['specific_risk'] ** 2 == pytest.approx(risk['total_risk'] ** 2)
+    np.testing.assert_allclose(risk['factor_exposures'], model.exposures.T @ weights)
+
+    model.set_portfolio(weights)
+    assert model.portfolio_risk()['total_risk'] == pytest.approx(risk['total_risk'])
+
+
+def test_risk_contributions_match_dense_covariance():
+    model, dense, rng = make_model()
+    weights = rng.normal(size=8)
+    total = np.sqrt(weights @ dense @ weights)
+
+    contributions = model.risk_contributions(weights)
+
+    np.testing.assert_allclose(contributions['marginal'], dense @ weights / total)
+    assert contributions['component'].sum() == pytest.approx(total)
+
+    model.set_portfolio(weights)
+    np.testing.assert_allclose(model.risk_contributions()['component'], contributions['component'])
+
+
+def test_what_if_single_trade_and_batch():
+    model, dense, rng = make_model()
+    weights = rng.normal(size=8)
+    model.set_portfolio({f"S{i}": w for i, w in enumerate(weights)})
+
+    trade = {"S1": 0.1, "S5": -0.2}
+    delta = np.zeros(8)
+    delta[[1, 5]] = [0.1, -0.2]
+    after = weights + delta
+
+    single = model.what_if(trade)
+    assert single['total_risk'] == pytest.approx(np.sqrt(after @ dense @ after))
+    assert single['delta_total_risk'] == pytest.approx(
+        np.sqrt(after @ dense @ after) - np.sqrt(weights @ dense @ weights)
+    )
+    np.testing.assert_allclose(single['factor_exposures'], model.exposures.T @ after)
+
+    trades = rng.normal(size=(5, 8))
+    batch = model.what_if(trades)
+    expected = np.sqrt(np.einsum("mn,nk,mk->m", weights + trades, dense, weights + trades))
+    np.testing.assert_allclose(batch['total_risk'], expected)
+    np.testing.assert_allclose(batch['factor_exposures'], (weights + trades) @ model.exposures)
+
+    # Current holdings are unchanged by queries
+    np.testing.assert_allclose(model.weights, weights)
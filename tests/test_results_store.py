@@ -0,0 +1,38 @@
+import datetime as dt
+
+import polars as pl
+
+from src.results_store import ResultsStore
+
+
+def make_results(final_value):
+    dates = [dt.date(2021, 1, 4), dt.date(2021, 1, 5)]
+    return {
+        'dates': dates,
+        'final_value': final_value,
+        'returns': [0.01],
+        'cumulative_returns': [0.01],
+        'drawdowns': [0.0],
+        'portfolio_history': [
+            {'date': d, 'positions': {"A": 1.0}, 'portfolio_value': final_value, 'is_rebalance': i == 0}
+            for i, d in enumerate(dates)
+        ],
+        'turnover_history': [{'date': dates[0], 'turnover': 1.0, 'cost': 5.0}],
+    }
+
+
+def test_runs_index_keeps_date_columns_and_namespaces_params(tmp_path):
+    store = ResultsStore(tmp_path)
+    store.write_run(make_results(1.0), params={'start_date': "2021-01-01", 'max_position': 0.1}, run_id="a")
+    store.write_run(make_results(2.0), params={'rebalance_frequency': 21}, run_id="b")
+
+    runs = store.runs().sort("run_id").collect()
+
+    assert runs.schema["start_date"] == pl.Date
+    assert runs["param_start_date"].to_list() == ["2021-01-01", None]
+    assert runs["max_position"].to_list() == [0.1, None]
+    assert runs["rebalance_frequency"].to_list() == [None, 21]
+    assert runs.filter(pl.col("start_date") >= dt.date(2021, 1, 1)).height == 2
+
+    assert store.load("positions", "b")["portfolio_value"].to_list() == [2.0, 2.0]
+    assert store.scan("turnover").collect().height == 2
@@ -0,0 +1,124 @@
+import datetime as dt
+
+import numpy as np
+import polars as pl
+
+from src.risk_model import GICS_SECTORS, build_fundamental_risk_model, build_risk_model
+
+SCORE_COLS = ("mom_score", "size_score", "value_score", "quality_score")
+
+
+def make_panel(n_dates=30, n_symbols=24, seed=0):
+    """
+    Long panel over four populated sectors with missing cells; Technology
+    (45) only exists before day 10 so it is empty on later dates.
+    """
+    rng = np.random.default_rng(seed)
+    dates = [dt.date(2021, 1, 1) + dt.timedelta(days=i) for i in range(n_dates)]
+    sectors = np.array([10, 20, 35, 45] * (n_symbols // 4), dtype=float)
+    n_rows = n_dates * n_symbols
+
+    panel = pl.DataFrame({
+        'date': np.repeat(np.array(dates), n_symbols).tolist(),
+        'symbol': [f"S{j:02d}" for j in range(n_symbols)] * n_dates,
+        'asset_returns': rng.normal(0, 0.02, n_rows),
+        'market_cap': rng.uniform(1, 50, n_rows),
+        'gsector': np.tile(sectors, n_dates),
+        **{col: rng.normal(size=n_rows) for col in SCORE_COLS},
+    })
+    day = pl.col("date").rank("dense") - 1
+    return panel.filter(
+        ~((pl.col("gsector") == 45) & (day >= 10))
+        & (pl.col("asset_returns") > -0.035)
+    )
+
+
+def reference_factor_returns(panel):
+    """
+    Per-date constrained WLS on the previous date's exposures, with only the
+    sectors present on each date.
+    """
+    sector_names = sorted(set(GICS_SECTORS.values()))
+    dates = sorted(panel["date"].unique().to_list())
+    rows = {}
+    for prev_date, date in zip(dates[:-1], dates[1:]):
+        today = panel.filter(pl.col("date") == date).select("symbol", "asset_returns")
+        prev = panel.filter(pl.col("date") == prev_date).drop("asset_returns", "date")
+        data = today.join(prev, on="symbol")
+
+        sector = np.array([sector_names.index(GICS_SECTORS[int(c)]) for c in data["gsector"]])
+        present = sorted(set(sector))
+        dummies = (sector[:, None] == np.array(present)).astype(float)
+        X = np.column_stack([np.ones(data.height), data.select(SCORE_COLS).to_numpy(), dummies])
+        w = np.sqrt(data["market_cap"].to_numpy())
+        y = data["asset_returns"].to_numpy()
+
+        caps = dummies.T @ (w ** 2)
+        c = np.concatenate([np.zeros(1 + len(SCORE_COLS)), caps / caps.sum()])
+        k = X.shape[1]
+        kkt = np.block([[X.T @ (w[:, None] * X), c[:, None]], [c[None, :], np.zeros((1, 1))]])
+        solution = np.linalg.solve(kkt, np.concatenate([X.T @ (w * y), [0.0]]))[:k]
+
+        sector_returns = dict.fromkeys(sector_names, 0.0)
+        sector_returns.update({sector_names[g]: solution[1 + len(SCORE_COLS) + j] for j, g in enumerate(present)})
+        rows[date] = (solution[:1 + len(SCORE_COLS)], sector_returns)
+    return rows
+
+
+def test_matches_per_date_solve_across_chunk_boundaries():
+    panel = make_panel()
+
+    factor_returns, residuals, factor_cov = build_fundamental_risk_model(panel, panel, chunk_size=7)
+    reference = reference_factor_returns(panel)
+
+    # Utilities etc. never have members and are dropped
+    assert factor_returns.columns == [
+        'date', 'market', 'momentum', 'size', 'value', 'quality',
+        'Energy', 'Healthcare', 'Industrial', 'Technology',
+    ]
+    assert np.all(np.isnan(factor_returns.row(0)[1:]))
+
+    for row in factor_returns.iter_rows(named=True):
+        if row['date'] not in reference:
+            continue
+        core, sectors = reference[row['date']]
+        np.testing.assert_allclose(
+            [row[name] for name in ('market', 'momentum', 'size', 'value', 'quality')], core, atol=1e-12
+        )
+        for name in ('Energy', 'Healthcare', 'Industrial', 'Technology'):
+            np.testing.assert_allclose(row[name], sectors[name], atol=1e-12)
+
+    assert factor_cov.shape == (9, 9)
+    assert residuals["residual"].is_finite().all()
+
+
+def test_chunk_size_does_not_change_results():
+    panel = make_panel()
+
+    chunked = build_fundamental_risk_model(panel, panel, chunk_size=4)
+    whole = build_fundamental_risk_model(panel, panel, chunk_size=1000)
+
+    np.testing.assert_allclose(
+        chunked[0].drop("date").to_numpy(), whole[0].drop("date").to_numpy(), atol=1e-14
+    )
+    np.testing.assert_allclose(chunked[2], whole[2], atol=1e-16)
+    assert chunked[1].sort("date", "symbol").equals(whole[1].sort("date", "symbol"))
+
+
+def test_build_risk_model_matches_diagonal_weighted_solve():
+    rng = np.random.default_rng(3)
+    n_stocks, n_dates = 5, 80
+    factor_returns = pl.DataFrame(rng.normal(0, 0.01, (n_dates, 3)), schema=["a", "b", "c"], orient="row")
+    stock_returns = rng.normal(0, 0.02, (n_stocks, n_dates))
+    mcaps = pl.DataFrame({'market_cap': rng.uniform(1, 10, n_stocks)})
+    mask = rng.random((n_stocks, n_dates)) > 0.2
+
+    exposures, _, _ = build_risk_model(stock_returns, factor_returns, mcaps, mask=mask)
+    from_frame, _, _ = build_risk_model(pl.DataFrame(stock_returns), factor_returns, mcaps, mask=mask)
+
+    np.testing.assert_array_equal(exposures, from_frame)
+    for i in range(n_stocks):
+        X = factor_returns.to_numpy()[mask[i]]
+        W = np.diag(np.full(mask[i].sum(), np.sqrt(mcaps["market_cap"][i])))
+        expected = np.linalg.solve(X.T @ W @ X, X.T @ W @ stock_returns[i, mask[i]])
+        np.testing.assert_allclose(exposures[i], expected, rtol=1e-10)
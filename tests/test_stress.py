@@ -0,0 +1,64 @@
+import datetime as dt
+
+import numpy as np
+import polars as pl
+
+from src.stress import FF_FACTORS, historical_scenarios, hypothetical_scenarios, stress_test
+
+
+def test_historical_scenarios_sum_each_window():
+    rng = np.random.default_rng(0)
+    dates = [dt.date(2022, 1, 1) + dt.timedelta(days=i) for i in range(10)]
+    factors = pl.DataFrame({'date': dates, **{f: rng.normal(0, 0.01, 10) for f in FF_FACTORS}})
+
+    scenarios = historical_scenarios(factors.reverse(), horizon=3)
+
+    assert scenarios.height == 8
+    assert scenarios["scenario"][0] == f"hist_{dates[0]}"
+    shocks = factors.select(FF_FACTORS).to_numpy()
+    np.testing.assert_allclose(scenarios.select(FF_FACTORS).to_numpy()[4], shocks[4:7].sum(axis=0))
+
+
+def test_hypothetical_scenarios_lie_on_the_sigma_ellipsoid():
+    rng = np.random.default_rng(1)
+    loadings = rng.normal(size=(6, 6))
+    factor_cov = loadings @ loadings.T / 100
+
+    scenarios = hypothetical_scenarios(factor_cov, n_scenarios=50, n_sigma=2.0, seed=0)
+    shocks = scenarios.select(FF_FACTORS).to_numpy()
+
+    assert scenarios.height == 12 + 50
+    # Single-factor shocks are +/- n_sigma vols
+    np.testing.assert_allclose(shocks[0], np.eye(6)[0] * 2 * np.sqrt(factor_cov[0, 0]))
+    np.testing.assert_allclose(shocks[6], -shocks[0])
+    # Joint shocks have Mahalanobis norm n_sigma
+    mahalanobis = np.einsum("sk,kl,sl->s", shocks[12:], np.linalg.inv(factor_cov), shocks[12:])
+    np.testing.assert_allclose(np.sqrt(mahalanobis), 2.0, rtol=1e-6)
+
+
+def test_stress_test_pnl_and_worst_cases():
+    rng = np.random.default_rng(2)
+    n_dates, n_stocks, n_factors = 4, 5, 6
+    weights = rng.normal(size=(n_dates, n_stocks))
+    exposures = rng.normal(size=(n_dates, n_stocks, n_factors))
+    specific_risk = rng.uniform(0.01, 0.04, n_stocks)
+    shocks = rng.normal(0, 0.02, (7, n_factors))
+    dates = [dt.date(2022, 1, 3 + i) for i in range(n_dates)]
+
+    result = stress_test(weights, exposures, specific_risk, shocks, dates=dates, gmv=1e6, chunk_size=3)
+
+    tail = -2.3263478740408408 * np.sqrt(weights ** 2 @ specific_risk) * 1e6
+    expected = np.array([
+        [shocks[s] @ (exposures[d].T @ weights[d]) * 1e6 + tail[d] for d in range(n_dates)]
+        for s in range(len(shocks))
+    ])
+    np.testing.assert_allclose(result['pnl'], expected)
+
+    by_date = result['by_date']
+    assert by_date["worst_scenario"].to_list() == [f"scenario_{i}" for i in expected.argmin(axis=0)]
+    np.testing.assert_allclose(by_date["worst_pnl"].to_numpy(), expected.min(axis=0))
+
+    by_scenario = result['by_scenario'].sort("scenario")
+    assert by_scenario["worst_date"].to_list() == [dates[i] for i in expected.argmin(axis=1)]
+    np.testing.assert_allclose(by_scenario["worst_pnl"].to_numpy(), expected.min(axis=1))
+    assert result['by_scenario']["worst_pnl"].is_sorted()
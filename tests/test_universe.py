@@ -0,0 +1,60 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from src.universe import UniverseIndex
+
+DATES = [dt.date(2020, 1, d) for d in (1, 2, 3, 6, 7, 8)]
+
+
+def make_index():
+    """
+    A trades throughout, B has a two-day gap and delists after day 4, C
+    lists on day 2 and D never trades.
+    """
+    bitmap = np.array([
+        [1, 1, 0, 0],
+        [1, 1, 0, 0],
+        [1, 0, 1, 0],
+        [1, 0, 1, 0],
+        [1, 1, 1, 0],
+        [1, 0, 1, 0],
+    ], dtype=bool)
+    return UniverseIndex(DATES, ["A", "B", "C", "D"], bitmap)
+
+
+def test_lifetimes():
+    lifetimes = make_index().lifetimes()
+
+    assert lifetimes["first_date"].to_list() == [DATES[0], DATES[0], DATES[2], None]
+    assert lifetimes["last_date"].to_list() == [DATES[5], DATES[4], DATES[5], None]
+    assert lifetimes["n_valid"].to_list() == [6, 3, 4, 0]
+
+
+def test_gaps():
+    gaps = make_index().gaps()
+
+    assert gaps.height == 1
+    assert gaps.row(0, named=True) == {
+        'symbol': "B", 'gap_start': DATES[2], 'gap_end': DATES[3], 'length': 2,
+    }
+
+
+def test_membership_masks():
+    index = make_index()
+
+    np.testing.assert_array_equal(index.tradable(DATES[3]), [True, False, True, False])
+    np.testing.assert_array_equal(index.listed(DATES[3]), [True, True, True, False])
+    np.testing.assert_array_equal(index.delisted(DATES[3]), [False, False, False, True])
+    np.testing.assert_array_equal(index.delisted(DATES[5]), [False, True, False, True])
+    assert index.tradable_symbols(DATES[0]) == ["A", "B"]
+
+
+def test_row_falls_back_to_previous_date():
+    index = make_index()
+
+    # Weekend between Jan 3 and Jan 6
+    assert index.row(dt.date(2020, 1, 4)) == 2
+    with pytest.raises(KeyError):
+        index.row(dt.date(2019, 12, 31))
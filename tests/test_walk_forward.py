@@ -0,0 +1,60 @@
+import numpy as np
+
+import pytest
+
+from src.backtest import blend_panels, simulate_blends
+from src.portfolio import alpha_weights
+from src.walk_forward import walk_forward, walk_forward_folds, _init_worker, _test_candidate
+from tests.test_backtest import SCORE_COLS, make_panel, quiet
+
+
+def test_walk_forward_folds_are_contiguous_and_clipped():
+    folds = walk_forward_folds(100, train_days=40, test_days=25)
+
+    assert folds == [(0, 40, 40, 65), (25, 65, 65, 90), (50, 90, 90, 100)]
+    for fold, next_fold in zip(folds, folds[1:]):
+        assert fold[3] == next_fold[2]
+
+    assert walk_forward_folds(40, train_days=40, test_days=25) == []
+
+
+def test_test_window_earns_from_first_test_date():
+    panel = make_panel()
+    dates = panel.select("date").unique().sort("date")["date"].to_list()
+    _, returns_panel, scores = blend_panels(panel, panel, SCORE_COLS, dates)
+    blend = np.array([0.4, 0.1, 0.3, 0.2])
+    capital, cost, max_position = 1_000_000, 0.0005, 0.15
+    fold = (0, 60, 60, 90)
+
+    _init_worker(returns_panel, scores)
+    returns = _test_candidate(
+        fold, {'max_position': max_position}, blend,
+        {'initial_capital': capital, 'rebalance_frequency': 21, 'transaction_cost': cost}
+    )
+
+    assert len(returns) == fold[3] - fold[2]
+
+    # Positions are formed on the last training date and earn the first
+    # test date's returns
+    positions = alpha_weights(scores[fold[2] - 1] @ blend[:, None], max_position)[:, 0] * capital
+    value = capital - np.abs(positions).sum() * cost
+    assert returns[0] == pytest.approx(returns_panel[fold[2]] @ positions / value, rel=1e-12)
+
+
+def test_parallel_walk_forward_matches_serial():
+    panel = make_panel(n_dates=160)
+    kwargs = {
+        'blend_weights': np.eye(4),
+        'settings_grid': [{'max_position': 0.15}, {'max_position': 0.3, 'max_vol': 0.2}],
+        'train_days': 80,
+        'test_days': 40,
+    }
+
+    serial = quiet(walk_forward, 1_000_000, panel, panel, n_jobs=1, **kwargs)
+    parallel = quiet(walk_forward, 1_000_000, panel, panel, n_jobs=2, **kwargs)
+
+    dates = panel.select("date").unique().sort("date")["date"].to_list()
+    assert serial['dates'] == dates[80:]
+    assert len(serial['returns']) == len(serial['dates'])
+    np.testing.assert_array_equal(parallel['returns'], serial['returns'])
+    assert parallel['folds'].equals(serial['folds'])